@@ -1,24 +1,21 @@
 import os
-import re
 import time
-import random
+import itertools
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from flask import Flask, render_template, request, jsonify, send_file, Response
 from flask_socketio import SocketIO, emit
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from selenium.webdriver.chrome.options import Options
-from openpyxl import load_workbook, Workbook
-import pandas as pd
 import json
-import queue
+
+import driver_pool
+import fetchers
+import orchestrator
+import extraction
+import urls
+from concurrency import ConcurrencyController, parse_worker_options
+from excel_sink import EXCEL_HEADERS, get_sink
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here'
@@ -33,101 +30,20 @@ scraping_status = {
     'failed': 0,
     'current_url': '',
     'progress': 0,
-    'speed': 0
+    'speed': 0,
+    'concurrency': 0,
+    'skipped': 0,
+    'stopped': False
 }
 
-data_queue = queue.Queue()
+# Set by /api/stop; each run gets a fresh token
+cancel_token = orchestrator.CancellationToken()
+
 scraped_data = []
 EXCEL_FILENAME = 'facebook_pages_data.xlsx'
 
-# Configure patterns for data detection
-EMAIL_PATTERN = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-
-PHONE_PATTERNS = [
-    r'(?:\+92|0092|92)?[-\s]?(3\d{2})[-\s]?(\d{7})',
-    r'(0?3\d{2})[-\s]?(\d{7})',
-    r'(0?3\d{2})\s?(\d{3}\s?\d{4})',
-    r'(\(0?3\d{2}\))\s?(\d{7})',
-    r'(?:\+971|00971|971)?[-\s]?(\d)[-\s]?(\d{3})[-\s]?(\d{4})',
-]
-
-COMPILED_PATTERNS = {
-    'email': re.compile(EMAIL_PATTERN, re.IGNORECASE),
-    'phone': [re.compile(pattern) for pattern in PHONE_PATTERNS],
-    'website': re.compile(r'(https?://[^\s]+|www\.[^\s]+)'),
-    'likes': re.compile(r'(\d+[,.]?\d*)\s*(likes|people\s+like\s+this)', re.IGNORECASE),
-    'followers': re.compile(r'(\d+[,.]?\d*)\s*(followers|people\s+follow\s+this)', re.IGNORECASE)
-}
-
-# Thread-local storage for WebDriver
-thread_local = threading.local()
-
-def get_driver():
-    """Get or create a WebDriver instance"""
-    if not hasattr(thread_local, 'driver'):
-        chrome_options = Options()
-        user_agents = [
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        ]
-        
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--window-size=1920,1080")
-        chrome_options.add_argument(f'user-agent={random.choice(user_agents)}')
-        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        chrome_options.add_experimental_option('excludeSwitches', ['enable-logging', 'enable-automation'])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        
-        try:
-            driver = webdriver.Chrome(options=chrome_options)
-            driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
-                'source': 'Object.defineProperty(navigator, "webdriver", {get: () => undefined})'
-            })
-            thread_local.driver = driver
-        except Exception as e:
-            print(f"Error creating driver: {e}")
-            return None
-    
-    return thread_local.driver
-
-def close_driver():
-    """Close WebDriver instance"""
-    if hasattr(thread_local, 'driver'):
-        thread_local.driver.quit()
-        del thread_local.driver
-
-def extract_using_patterns(text, pattern_type):
-    """Extract data using pre-compiled regex patterns"""
-    if not text:
-        return ""
-    
-    if pattern_type == 'email':
-        match = COMPILED_PATTERNS['email'].search(text)
-        return match.group(0) if match else ""
-    
-    elif pattern_type == 'phone':
-        for pattern in COMPILED_PATTERNS['phone']:
-            match = pattern.search(text)
-            if match:
-                phone = ''.join([g for g in match.groups() if g])
-                return normalize_phone(phone)
-        return ""
-    
-    elif pattern_type == 'website':
-        match = COMPILED_PATTERNS['website'].search(text)
-        return match.group(0) if match else ""
-    
-    return ""
-
-def normalize_phone(phone):
-    """Normalize phone number"""
-    if not phone:
-        return ""
-    cleaned = re.sub(r'[^\d+]', '', phone)
-    return cleaned if len(cleaned) >= 8 else ""
+# Uses a precompiled pattern instead of re.sub on every call
+normalize_phone = extraction.normalize_phone
 
 def detect_country(phone):
     """Detect country from phone number"""
@@ -140,130 +56,83 @@ def detect_country(phone):
     return "Unknown"
 
 def save_to_excel(data, filename=EXCEL_FILENAME):
-    """Save data to Excel file"""
-    lock = threading.Lock()
-    with lock:
-        try:
-            if os.path.exists(filename):
-                wb = load_workbook(filename)
-                ws = wb.active
-                if ws.max_row == 1 and ws['A1'].value != 'Name':
-                    headers = ['Name', 'Email', 'Phone', 'Country', 'Page Link', 'Website', 
-                              'Location', 'Address', 'Likes', 'Followers', 'Scrape Time']
-                    ws.append(headers)
-            else:
-                wb = Workbook()
-                ws = wb.active
-                headers = ['Name', 'Email', 'Phone', 'Country', 'Page Link', 'Website', 
-                          'Location', 'Address', 'Likes', 'Followers', 'Scrape Time']
-                ws.append(headers)
-            
-            ws.append([
-                data.get('name', '')[:100],
-                data.get('email', ''),
-                data.get('phone', ''),
-                data.get('country', ''),
-                data.get('page_link', ''),
-                data.get('website', ''),
-                data.get('location', ''),
-                data.get('address', ''),
-                data.get('likes', ''),
-                data.get('followers', ''),
-                datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            ])
-            
-            wb.save(filename)
-            return True
-        except Exception as e:
-            print(f"Error saving to Excel: {e}")
-            return False
+    """Append a row to the Excel sink; the workbook is rewritten on checkpoints"""
+    try:
+        get_sink(filename).append([
+            data.get('name', '')[:100],
+            data.get('email', ''),
+            data.get('phone', ''),
+            data.get('country', ''),
+            data.get('page_link', ''),
+            data.get('website', ''),
+            data.get('location', ''),
+            data.get('address', ''),
+            data.get('likes', ''),
+            data.get('followers', ''),
+            datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        ])
+        return True
+    except Exception as e:
+        print(f"Error saving to Excel: {e}")
+        return False
 
-def scrape_facebook_page(url):
-    """Scrape a single Facebook page"""
-    driver = get_driver()
-    if not driver:
-        return None
-    
+def extract_page_data(url, page):
+    """Extract page data from a fetched page snapshot"""
     data = {
         'name': '', 'email': '', 'phone': '', 'country': '',
         'page_link': url, 'website': '', 'location': '',
         'address': '', 'likes': '', 'followers': ''
     }
     
-    try:
-        driver.get(url)
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.TAG_NAME, "body"))
-        )
-        
-        page_text = driver.find_element(By.TAG_NAME, 'body').text
-        
-        # Extract name
-        try:
-            name_elem = driver.find_element(By.XPATH, "//h1 | //title")
-            data['name'] = name_elem.text.strip()[:100]
-        except:
-            data['name'] = url.split('/')[-1]
-        
-        # Extract contact info
-        data['email'] = extract_using_patterns(page_text, 'email')
-        phone_num = extract_using_patterns(page_text, 'phone')
-        data['phone'] = phone_num
-        data['country'] = detect_country(phone_num) if phone_num else ""
-        data['website'] = extract_using_patterns(page_text, 'website')
-        
-        # Extract social stats
-        likes_match = COMPILED_PATTERNS['likes'].search(page_text)
-        followers_match = COMPILED_PATTERNS['followers'].search(page_text)
-        
-        data['likes'] = likes_match.group(1).replace(',', '') if likes_match else ""
-        data['followers'] = followers_match.group(1).replace(',', '') if followers_match else ""
-        
-        # Try to get location/address
-        try:
-            location_elem = driver.find_elements(By.XPATH, 
-                "//div[contains(text(), 'Location') or contains(text(), 'Address')]/following-sibling::div")
-            if location_elem:
-                data['address'] = location_elem[0].text[:200]
-        except:
-            pass
-        
-        # Save to Excel
-        save_to_excel(data)
-        
-        return data
-        
-    except Exception as e:
-        print(f"Error scraping {url}: {e}")
-        return None
-    finally:
-        driver.get("about:blank")
+    page_text = page['text']
+    
+    # Extract name
+    data['name'] = (page['title'] or page['meta'].get('og:title', '')).strip()[:100] or url.split('/')[-1]
+    
+    # Extract contact info and social stats in a single pass over the text
+    fields = extraction.extract_fields(page_text)
+    data['email'] = fields['email']
+    phone_num = fields['phone']
+    data['phone'] = phone_num
+    data['country'] = detect_country(phone_num) if phone_num else ""
+    data['website'] = fields['website']
+    
+    # Extract social stats
+    
+    data['likes'] = fields['likes'].replace(',', '')
+    data['followers'] = fields['followers'].replace(',', '')
+    
+    # Location/address block, if the engine found one
+    data['address'] = page['address'][:200]
+    
+    return data
 
+def scrape_facebook_page(url, cancel=None):
+    """Scrape a single Facebook page, escalating from plain HTTP to Selenium if needed"""
+    data = fetchers.fetch_and_extract(url, extract_page_data, cancel=cancel)
+    if not data:
+        return None
+    
+    # Save to Excel
+    save_to_excel(data)
+    
+    return data
 
+# Facebook link formats accepted from uploaded HTML
+FACEBOOK_LINK_PATTERNS = [
+    r'https?://(www\.)?facebook\.com/[A-Za-z0-9_.-]+/?',
+    r'https?://(www\.)?facebook\.com/pages/[^/]+/\d+',
+    r'https?://(www\.)?facebook\.com/profile\.php\?id=\d+',
+    r'https?://(www\.)?facebook\.com/groups/[A-Za-z0-9_.-]+'
+]
 
 def extract_links_from_html(html_content, base_url='https://www.facebook.com'):
-    """Extract Facebook links from HTML content"""
-    soup = BeautifulSoup(html_content, 'html.parser')
-    links = set()
-    
-    # Look for Facebook links in various formats
-    facebook_patterns = [
-        r'https?://(www\.)?facebook\.com/[A-Za-z0-9_.-]+/?',
-        r'https?://(www\.)?facebook\.com/pages/[^/]+/\d+',
-        r'https?://(www\.)?facebook\.com/profile\.php\?id=\d+',
-        r'https?://(www\.)?facebook\.com/groups/[A-Za-z0-9_.-]+'
-    ]
-    
-    for a_tag in soup.find_all('a', href=True):
-        href = a_tag['href']
-        for pattern in facebook_patterns:
-            if re.match(pattern, href):
-                if base_url and not href.startswith('http'):
-                    href = urljoin(base_url, href)
-                links.add(href)
-                break
-    
-    return list(links)
+    """Extract Facebook links from HTML content
+
+    Streams the href attributes through one combined pattern; the old
+    BeautifulSoup pass is only used if the streaming parser fails.
+    """
+    return urls.extract_links(html_content, base_url, FACEBOOK_LINK_PATTERNS)
 
 def update_scraping_status(status_update):
     """Update scraping status and emit via SocketIO"""
@@ -271,45 +140,55 @@ def update_scraping_status(status_update):
     scraping_status.update(status_update)
     socketio.emit('status_update', scraping_status)
 
-def scraping_worker(links, html_content=None):
+def scraping_worker(links, html_content=None, max_workers=3, adaptive=False, cancel=None):
     """Main scraping worker function"""
     global scraping_status
-    
-    all_links = []
+    cancel = cancel or orchestrator.CancellationToken()
     
     # If HTML content is provided, extract links from it
-    if html_content:
-        extracted_links = extract_links_from_html(html_content)
-        all_links.extend(extracted_links)
+    extracted_links = extract_links_from_html(html_content) if html_content else []
     
-    # Add any direct links
-    all_links.extend(links)
+    # Extracted links first, then any direct links, each canonical page once
+    unique_links = urls.dedupe(itertools.chain(extracted_links, links))
     
-    if not all_links:
+    # Pages already in the workbook are skipped before they take a browser slot
+    page_link = EXCEL_HEADERS.index('Page Link')
+    known = {urls.canonicalize(row[page_link]) for row in get_sink(EXCEL_FILENAME).rows() if row[page_link]}
+    all_links = [link for link in unique_links if link not in known]
+    total = len(all_links)
+    scraping_status['skipped'] = len(extracted_links) + len(links) - total
+    
+    if not total:
         update_scraping_status({'is_running': False})
         return
     
-    total = len(all_links)
     update_scraping_status({
         'is_running': True,
         'total': total,
         'processed': 0,
         'successful': 0,
         'failed': 0,
-        'progress': 0
+        'progress': 0,
+        'stopped': False
     })
     
-    # Process links with threading
-    with ThreadPoolExecutor(max_workers=3) as executor:
-        futures = []
-        for link in all_links:
-            futures.append(executor.submit(process_single_url, link))
-        
-        for future in as_completed(futures):
+    # Threads are sized for the controller's ceiling; the controller gates how many run
+    controller = ConcurrencyController(max_workers, adaptive=adaptive)
+    driver_pool.get_pool().ensure_capacity(controller.maximum)
+    scraping_status['concurrency'] = controller.level
+    
+    def work(link):
+        return controller.run(process_single_url, link, cancel)
+    
+    # Process links with threading; only controller.level pages are in flight at once
+    with ThreadPoolExecutor(max_workers=controller.maximum) as executor:
+        for link, result, error in orchestrator.stream(all_links, work, lambda: controller.level, executor, cancel):
+            if isinstance(error, orchestrator.Cancelled):
+                continue
             try:
-                result = future.result()
+                if error:
+                    raise error
                 if result:
-                    data_queue.put(result)
                     socketio.emit('new_data', result)
                     
                     # Update status
@@ -322,6 +201,7 @@ def scraping_worker(links, html_content=None):
                 # Calculate progress
                 progress = (scraping_status['processed'] / total) * 100
                 scraping_status['progress'] = round(progress, 1)
+                scraping_status['concurrency'] = controller.level
                 
                 # Emit status update
                 socketio.emit('status_update', scraping_status)
@@ -331,21 +211,27 @@ def scraping_worker(links, html_content=None):
                 scraping_status['failed'] += 1
                 scraping_status['processed'] += 1
     
+    # Write everything scraped in this job to the workbook
+    get_sink(EXCEL_FILENAME).checkpoint()
+    
     # Final cleanup
-    update_scraping_status({'is_running': False})
-    close_driver()
+    update_scraping_status({'is_running': False, 'stopped': cancel.cancelled})
 
-def process_single_url(url):
-    """Process a single URL and return data"""
+def process_single_url(url, cancel=None):
+    """Process a single URL and return data; raises Cancelled once the run is stopped"""
+    if cancel is not None:
+        cancel.raise_if_cancelled()
     update_scraping_status({'current_url': url})
     
     start_time = time.time()
-    data = scrape_facebook_page(url)
+    data = scrape_facebook_page(url, cancel)
     elapsed = time.time() - start_time
     
     if data:
         data['scrape_time'] = round(elapsed, 2)
         return data
+    if cancel is not None:
+        cancel.raise_if_cancelled()
     return None
 
 # Flask Routes
@@ -357,7 +243,7 @@ def index():
 @app.route('/api/scrape', methods=['POST'])
 def start_scraping():
     """Start scraping process"""
-    global scraping_status
+    global scraping_status, cancel_token
     
     if scraping_status['is_running']:
         return jsonify({'error': 'Scraping already in progress'}), 400
@@ -365,9 +251,14 @@ def start_scraping():
     data = request.json
     links = data.get('links', [])
     html_content = data.get('html_content', '')
+    max_workers, adaptive = parse_worker_options(data)
     
-    # Start scraping in background thread
-    thread = threading.Thread(target=scraping_worker, args=(links, html_content))
+    # Start scraping in background thread with a token /api/stop can set
+    cancel_token = orchestrator.CancellationToken()
+    thread = threading.Thread(
+        target=scraping_worker,
+        args=(links, html_content, max_workers, adaptive, cancel_token)
+    )
     thread.daemon = True
     thread.start()
     
@@ -375,10 +266,12 @@ def start_scraping():
 
 @app.route('/api/stop', methods=['POST'])
 def stop_scraping():
-    """Stop scraping process"""
-    # Note: This is a simple implementation. For proper stopping,
-    # you would need to implement thread termination logic
-    update_scraping_status({'is_running': False})
+    """Stop scraping process
+
+    Queued pages are dropped and pages being loaded give up at their next
+    check or the page-load timeout; status reports stopped once they have.
+    """
+    cancel_token.cancel()
     return jsonify({'message': 'Stop command sent'})
 
 @app.route('/api/status')
@@ -388,14 +281,14 @@ def get_status():
 
 @app.route('/api/data')
 def get_data():
-    """Get scraped data"""
-    # Read data from Excel file
+    """Get scraped data, optionally paginated with limit/offset"""
+    # Served from the sink's in-memory rows instead of re-parsing the workbook
     try:
-        if os.path.exists(EXCEL_FILENAME):
-            df = pd.read_excel(EXCEL_FILENAME)
-            data = df.to_dict('records')
-            return jsonify(data)
-        return jsonify([])
+        limit = request.args.get('limit', type=int)
+        offset = request.args.get('offset', 0, type=int)
+        
+        data = get_sink(EXCEL_FILENAME).records(offset, limit)
+        return jsonify(data)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -405,6 +298,8 @@ def export_data():
     if not os.path.exists(EXCEL_FILENAME):
         return jsonify({'error': 'No data available'}), 404
     
+    get_sink(EXCEL_FILENAME).checkpoint()
+    
     return send_file(
         EXCEL_FILENAME,
         as_attachment=True,
@@ -415,16 +310,8 @@ def export_data():
 def clear_data():
     """Clear all scraped data"""
     try:
-        if os.path.exists(EXCEL_FILENAME):
-            os.remove(EXCEL_FILENAME)
-        
-        # Create fresh Excel file with headers
-        wb = Workbook()
-        ws = wb.active
-        headers = ['Name', 'Email', 'Phone', 'Country', 'Page Link', 'Website', 
-                  'Location', 'Address', 'Likes', 'Followers', 'Scrape Time']
-        ws.append(headers)
-        wb.save(EXCEL_FILENAME)
+        # Replace the workbook with a fresh one containing only headers
+        get_sink(EXCEL_FILENAME).clear()
         
         return jsonify({'message': 'Data cleared successfully'})
     except Exception as e:
@@ -467,12 +354,10 @@ def handle_disconnect():
 if __name__ == '__main__':
     # Create Excel file with headers if it doesn't exist
     if not os.path.exists(EXCEL_FILENAME):
-        wb = Workbook()
-        ws = wb.active
-        headers = ['Name', 'Email', 'Phone', 'Country', 'Page Link', 'Website', 
-                  'Location', 'Address', 'Likes', 'Followers', 'Scrape Time']
-        ws.append(headers)
-        wb.save(EXCEL_FILENAME)
+        get_sink(EXCEL_FILENAME).checkpoint()
+    
+    # Start browsers ahead of the first job
+    driver_pool.warm_up_in_background()
     
     print("Starting Facebook Page Scraper UI...")
     print("Open your browser and go to: http://localhost:5000")
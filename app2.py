@@ -1,26 +1,32 @@
 # app.py
 import os
-import re
+import io
+import csv
 import time
-import random
+import tempfile
+import itertools
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from urllib.parse import urljoin
-from datetime import datetime
-from flask import Flask, render_template, request, jsonify, send_file
-from flask_socketio import SocketIO, emit
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from flask import Flask, render_template, request, jsonify, send_file, Response, stream_with_context
+from flask_socketio import SocketIO, emit, join_room, leave_room
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from selenium.webdriver.chrome.options import Options
 import queue
 import json
 
 # Import database module
 import database as db
+import driver_pool
+import fetchers
+import orchestrator
+import extraction
+import failures
+import metrics
+import urls
+from concurrency import DEFAULT_WORKERS, ConcurrencyController, parse_worker_options
+from process_backend import DEFAULT_PROCESSES, ProcessScrapeBackend
+from scheduler import JobScheduler, ScheduledJob
+from status import StatusAggregator
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here'
@@ -28,106 +34,54 @@ port = int(os.environ.get("PORT", 5000))
 host = "0.0.0.0"
 socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
 
-# Global state for current job
-current_job = {
-    'id': None,
-    'is_running': False,
-    'processed': 0,
-    'total': 0,
-    'successful': 0,
-    'failed': 0,
-    'current_url': '',
-    'progress': 0,
-    'speed': 0
-}
-
-# Thread-local storage for WebDriver
-thread_local = threading.local()
-
-# Configure patterns for data detection
-EMAIL_PATTERN = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-PHONE_PATTERNS = [
-    r'(?:\+92|0092|92)?[-\s]?(3\d{2})[-\s]?(\d{7})',
-    r'(0?3\d{2})[-\s]?(\d{7})',
-    r'(0?3\d{2})\s?(\d{3}\s?\d{4})',
-    r'(\(0?3\d{2}\))\s?(\d{7})',
-    r'(?:\+971|00971|971)?[-\s]?(\d)[-\s]?(\d{3})[-\s]?(\d{4})',
-]
+def new_job_status(job_id=None, job_name=''):
+    """Status of one job, in the shape the UI expects"""
+    return {
+        'id': job_id,
+        'job_name': job_name,
+        'is_running': False,
+        'processed': 0,
+        'total': 0,
+        'successful': 0,
+        'failed': 0,
+        'current_url': '',
+        'progress': 0,
+        'speed': 0,
+        'concurrency': 0,
+        'skipped': 0,
+        'cache_hits': 0,
+        'cache_saved_seconds': 0,
+        'priority': 0,
+        'failures': {},
+        'retry_round': 0,
+        'retry_at': None
+    }
 
-COMPILED_PATTERNS = {
-    'email': re.compile(EMAIL_PATTERN, re.IGNORECASE),
-    'phone': [re.compile(pattern) for pattern in PHONE_PATTERNS],
-    'website': re.compile(r'(https?://[^\s]+|www\.[^\s]+)'),
-    'likes': re.compile(r'(\d+[,.]?\d*)\s*(likes|people\s+like\s+this)', re.IGNORECASE),
-    'followers': re.compile(r'(\d+[,.]?\d*)\s*(followers|people\s+follow\s+this)', re.IGNORECASE)
-}
-
-def get_driver():
-    """Get or create a WebDriver instance"""
-    if not hasattr(thread_local, 'driver'):
-        chrome_options = Options()
-        user_agents = [
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        ]
-        
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--window-size=1920,1080")
-        chrome_options.add_argument(f'user-agent={random.choice(user_agents)}')
-        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        chrome_options.add_experimental_option('excludeSwitches', ['enable-logging', 'enable-automation'])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        
-        try:
-            driver = webdriver.Chrome(options=chrome_options)
-            driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
-                'source': 'Object.defineProperty(navigator, "webdriver", {get: () => undefined})'
-            })
-            thread_local.driver = driver
-        except Exception as e:
-            print(f"Error creating driver: {e}")
-            return None
-    
-    return thread_local.driver
-
-def close_driver():
-    """Close WebDriver instance"""
-    if hasattr(thread_local, 'driver'):
-        thread_local.driver.quit()
-        del thread_local.driver
-
-def extract_using_patterns(text, pattern_type):
-    """Extract data using pre-compiled regex patterns"""
-    if not text:
-        return ""
-    
-    if pattern_type == 'email':
-        match = COMPILED_PATTERNS['email'].search(text)
-        return match.group(0) if match else ""
-    
-    elif pattern_type == 'phone':
-        for pattern in COMPILED_PATTERNS['phone']:
-            match = pattern.search(text)
-            if match:
-                phone = ''.join([g for g in match.groups() if g])
-                return normalize_phone(phone)
-        return ""
-    
-    elif pattern_type == 'website':
-        match = COMPILED_PATTERNS['website'].search(text)
-        return match.group(0) if match else ""
-    
-    return ""
-
-def normalize_phone(phone):
-    """Normalize phone number"""
-    if not phone:
-        return ""
-    cleaned = re.sub(r'[^\d+]', '', phone)
-    return cleaned if len(cleaned) >= 8 else ""
+# Live status of every job this process has started, by job id
+jobs = {}
+
+# The most recently started job, which the single-job UI follows
+current_job = new_job_status()
+
+# When this process started each running job, and how much was already done then
+job_clocks = {}
+
+# Cancellation token of every scheduled job, set by /api/stop
+job_tokens = {}
+
+# Pending backoff timer of every job waiting to retry its transient failures
+job_retry_timers = {}
+
+# Every job's pages run on one shared lane per backend
+SCHEDULER_WORKERS = int(os.environ.get('SCRAPER_SCHEDULER_WORKERS', DEFAULT_WORKERS * 2))
+SCHEDULER_ADAPTIVE = os.environ.get('SCRAPER_ADAPTIVE', '0') == '1'
+SCHEDULER_PROCESSES = int(os.environ.get('SCRAPER_PROCESS_WORKERS', DEFAULT_PROCESSES))
+
+# Largest page of rows /api/data returns
+MAX_DATA_LIMIT = 1000
+
+# Uses a precompiled pattern instead of re.sub on every call
+normalize_phone = extraction.normalize_phone
 
 def detect_country(phone):
     """Detect country from phone number"""
@@ -139,239 +93,473 @@ def detect_country(phone):
         return "US/Canada"
     return "Unknown"
 
-def scrape_facebook_page(url):
-    """Scrape a single Facebook page"""
-    driver = get_driver()
-    if not driver:
-        return None
-    
+def extract_page_data(url, page):
+    """Extract page data from a fetched page snapshot"""
     data = {
         'name': '', 'email': '', 'phone': '', 'country': '',
         'page_link': url, 'website': '', 'location': '',
         'address': '', 'likes': 0, 'followers': 0
     }
     
-    try:
-        driver.get(url)
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.TAG_NAME, "body"))
-        )
-        
-        page_text = driver.find_element(By.TAG_NAME, 'body').text
-        
-        # Extract name
-        try:
-            name_elem = driver.find_element(By.XPATH, "//h1 | //title")
-            data['name'] = name_elem.text.strip()[:100]
-        except:
-            data['name'] = url.split('/')[-1]
-        
-        # Extract contact info
-        data['email'] = extract_using_patterns(page_text, 'email')
-        phone_num = extract_using_patterns(page_text, 'phone')
-        data['phone'] = phone_num
-        data['country'] = detect_country(phone_num) if phone_num else ""
-        data['website'] = extract_using_patterns(page_text, 'website')
-        
-        # Extract social stats
-        likes_match = COMPILED_PATTERNS['likes'].search(page_text)
-        followers_match = COMPILED_PATTERNS['followers'].search(page_text)
+    page_text = page['text']
+    
+    # Extract name
+    data['name'] = (page['title'] or page['meta'].get('og:title', '')).strip()[:100] or url.split('/')[-1]
+    
+    # Extract contact info and social stats in a single pass over the text
+    found = extraction.scan(page_text)
+    fields = extraction.extract_fields(page_text, found)
+    
+    # Keep every contact candidate; the best-ranked one of each kind is the headline value
+    ranked = extraction.rank_contacts(page_text, data['name'], found)
+    data['contacts'] = [candidate for kind in ranked for candidate in ranked[kind]]
+    data['email'] = ranked['email'][0]['value'] if ranked['email'] else ""
+    phone_num = ranked['phone'][0]['value'] if ranked['phone'] else ""
+    data['phone'] = phone_num
+    data['country'] = detect_country(phone_num) if phone_num else ""
+    data['website'] = ranked['website'][0]['value'] if ranked['website'] else ""
+    
+    # Extract social stats
+    
+    if fields['likes']:
+        likes_str = fields['likes'].replace(',', '').replace('.', '')
+        data['likes'] = int(likes_str) if likes_str.isdigit() else 0
+    if fields['followers']:
+        followers_str = fields['followers'].replace(',', '').replace('.', '')
+        data['followers'] = int(followers_str) if followers_str.isdigit() else 0
+    
+    # Location/address block, if the engine found one
+    data['address'] = page['address'][:200]
+    
+    return data
+
+def scrape_facebook_page(url, cancel=None):
+    """Scrape a single Facebook page, escalating from plain HTTP to Selenium if needed"""
+    return fetchers.fetch_and_extract(url, extract_page_data, cancel=cancel)
+
+# Facebook link formats accepted from uploaded HTML
+FACEBOOK_LINK_PATTERNS = [
+    r'https?://(www\.)?facebook\.com/[A-Za-z0-9_.-]+/?',
+    # r'https?://(www\.)?facebook\.com/pages/[^/]+/\d+',
+    r'https?://(www\.)?facebook\.com/profile\.php\?id=\d+'
+    # r'https?://(www\.)?facebook\.com/groups/[A-Za-z0-9_.-]+'
+]
+
+def extract_links_from_html(html_content, base_url='https://www.facebook.com'):
+    """Extract Facebook links from HTML content by streaming its hrefs through one combined pattern"""
+    return urls.extract_links(html_content, base_url, FACEBOOK_LINK_PATTERNS)
+
+def job_room(job_id):
+    """SocketIO room that receives one job's updates"""
+    return f'job-{job_id}'
+
+def emit_status_diff(job_id, diff):
+    """Send a job's changed status keys to its room, and to everyone if it is the current job"""
+    socketio.emit('job_status_diff', diff, to=job_room(job_id))
+    if jobs.get(job_id) is current_job:
+        socketio.emit('status_diff', diff)
+
+def save_status_counters(job_id, status):
+    """Write a job's counters to scraping_jobs"""
+    db.update_job_status(
+        job_id,
+        processed_urls=status['processed'],
+        successful_urls=status['successful'],
+        failed_urls=status['failed']
+    )
+
+# Status changes are held in memory and sent/saved on a fixed tick, not per page
+status_updates = StatusAggregator(
+    emit_status_diff, save_status_counters, ('processed', 'successful', 'failed')
+)
+
+def update_job_status(job_id, status_update):
+    """Update a job's status in memory; the aggregator broadcasts and saves it"""
+    status_updates.update(job_id, status_update)
+
+def set_current_job(status):
+    """Make a job the one the single-job UI follows, sending it in full"""
+    global current_job
+    current_job = status
+    socketio.emit('status_update', status)
+
+def run_thread_lane(items, window):
+    """Scrape (job_id, url) items on a thread pool, at most window() at once, yielding each result as it completes"""
+    def work(item):
+        job_id, url, queued_at = item
+        return lane_controller.run(process_single_url, url, job_id, job_tokens.get(job_id), queued_at)
+    
+    with ThreadPoolExecutor(max_workers=lane_controller.maximum) as executor:
+        for item, result, error in orchestrator.stream(stamp_items(items), work, window, executor):
+            yield item[:2], result, error
+
+def stamp_items(items):
+    """Add the wall-clock time each (job_id, url) item left the scheduler, for its queue wait"""
+    for item in items:
+        if item is orchestrator.IDLE:
+            yield item
+            continue
+        job_id, url = item
+        yield job_id, url, time.time()
+
+def scrape_job_item(item):
+    """Worker-process target: scrape the url of a (job_id, url, queued_at) item"""
+    return scrape_url(item[1], queued_at=item[2])
+
+def run_process_lane(items, window):
+    """Scrape (job_id, url) items in worker processes, yielding each result as it completes"""
+    with ProcessScrapeBackend(scrape_job_item, SCHEDULER_PROCESSES) as backend:
+        for item, result, error in backend.imap_unordered(stamp_items(items), window):
+            if not result:
+                save_failed_url(item[0], item[1], error)
+            yield item[:2], result, error
+
+def handle_result(job_id, url, result, error):
+    """Record one finished page of a job"""
+    status = jobs[job_id]
+    if isinstance(error, orchestrator.Cancelled):
+        # Its job was stopped first; the URL goes back to pending, not failed
+        metrics.registry.count('cancelled', job_id)
+        return
+    if error:
+        print(f"Error scraping {url}: {error}")
+    
+    if result:
+        timings = result.setdefault('phase_timings', {})
+        with metrics.timed(timings, 'socket_emit'):
+            socketio.emit('new_data', result)
+        timings['socket_emit'] = round(timings['socket_emit'], 4)
+        metrics.registry.observe_timings(timings, job_id)
+        metrics.registry.count('success', job_id)
         
-        if likes_match:
-            likes_str = likes_match.group(1).replace(',', '').replace('.', '')
-            data['likes'] = int(likes_str) if likes_str.isdigit() else 0
-        if followers_match:
-            followers_str = followers_match.group(1).replace(',', '').replace('.', '')
-            data['followers'] = int(followers_str) if followers_str.isdigit() else 0
+        # Hand off to the batched database writer; blocks if it falls behind
+        db.queue_scraped_data(job_id, result)
         
-        # Try to get location/address
-        try:
-            location_elem = driver.find_elements(By.XPATH, 
-                "//div[contains(text(), 'Location') or contains(text(), 'Address')]/following-sibling::div")
-            if location_elem:
-                data['address'] = location_elem[0].text[:200]
-        except:
-            pass
+        # Update status
+        status['successful'] += 1
+    else:
+        kind = failures.from_error(error).kind
+        metrics.registry.count(kind, job_id)
+        status['failures'] = dict(status['failures'], **{kind: status['failures'].get(kind, 0) + 1})
+        status['failed'] += 1
+    
+    status['processed'] += 1
+    status['current_url'] = url
+    
+    # Calculate progress
+    if status['total']:
+        status['progress'] = round((status['processed'] / status['total']) * 100, 1)
+    status['concurrency'] = lane_controller.level
+    
+    # Calculate speed (items per minute) over what this process has scraped
+    started_at, processed_before = job_clocks[job_id]
+    elapsed_time = time.time() - started_at
+    if elapsed_time > 0:
+        status['speed'] = round(((status['processed'] - processed_before) / elapsed_time) * 60, 1)
+    
+    # Emit status update
+    update_job_status(job_id, {})
+
+def finish_job(job):
+    """Commit a job's rows and mark it completed or stopped, unless its transient failures get a retry"""
+    # Its rows were all queued before it finished; wait for those, not for other jobs' later rows
+    db.flush_scraped_data()
+    
+    if job.error is not None:
+        # Its URLs could not be read; whatever was not scraped stays pending
+        db.update_job_status(
+            job.job_id,
+            status='failed',
+            completed_at=datetime.now().isoformat(),
+            error_message=f'Could not read its URLs: {job.error}'
+        )
+    else:
+        # A stopped job's leased but unscraped URLs stay pending; anything else still open failed
+        db.finish_unleased_job_urls(job.job_id, 'pending' if job.stopped else 'failed')
         
-        return data
+        if not job.stopped and schedule_retry(job.job_id):
+            return
         
-    except Exception as e:
-        print(f"Error scraping {url}: {e}")
-        return None
-    finally:
-        driver.get("about:blank")
-
-def extract_links_from_html(html_content, base_url='https://www.facebook.com'):
-    """Extract Facebook links from HTML content"""
-    soup = BeautifulSoup(html_content, 'html.parser')
-    links = set()
-    
-    # Look for Facebook links in various formats
-    facebook_patterns = [
-        r'https?://(www\.)?facebook\.com/[A-Za-z0-9_.-]+/?',
-        # r'https?://(www\.)?facebook\.com/pages/[^/]+/\d+',
-        r'https?://(www\.)?facebook\.com/profile\.php\?id=\d+'
-        # r'https?://(www\.)?facebook\.com/groups/[A-Za-z0-9_.-]+'
-    ]
-    
-    for a_tag in soup.find_all('a', href=True):
-        href = a_tag['href']
-        for pattern in facebook_patterns:
-            if re.match(pattern, href):
-                if base_url and not href.startswith('http'):
-                    href = urljoin(base_url, href)
-                links.add(href)
-                break
-    
-    return list(links)
-
-def update_job_status(status_update):
-    """Update current job status and emit via SocketIO"""
-    global current_job
-    current_job.update(status_update)
-    
-    # Also update in database if job ID exists
-    if current_job['id']:
         db.update_job_status(
-            current_job['id'],
-            processed_urls=current_job['processed'],
-            successful_urls=current_job['successful'],
-            failed_urls=current_job['failed']
+            job.job_id,
+            status='stopped' if job.stopped else 'completed',
+            completed_at=datetime.now().isoformat()
         )
     
-    socketio.emit('status_update', current_job)
-
-def scraping_worker(links, html_content=None, job_name="Scraping Job"):
-    """Main scraping worker function"""
-    global current_job
+    # Final cleanup, sent and saved straight away
+    release_job(job.job_id)
+    update_job_status(job.job_id, {'is_running': False, 'retry_at': None})
+    status_updates.untrack(job.job_id)
+
+def schedule_retry(job_id):
+    """Requeue a job's transient failures and resubmit it after a backoff; False if there are none"""
+    requeued, attempt = db.requeue_failed_job_urls(job_id, failures.RETRY_KINDS)
+    if not requeued:
+        return False
+    
+    delay = failures.retry_delay(attempt)
+    print(f"Job {job_id}: retrying {requeued} failed URLs in {delay:.0f}s (round {attempt})")
+    update_job_status(job_id, {
+        'retry_round': attempt,
+        'retry_at': (datetime.now() + timedelta(seconds=delay)).isoformat(),
+        'current_url': ''
+    })
+    timer = threading.Timer(delay, resubmit_job, (job_id,))
+    timer.daemon = True
+    job_retry_timers[job_id] = timer
+    timer.start()
+    return True
+
+def resubmit_job(job_id):
+    """Run a job's requeued URLs once its backoff has passed"""
+    if job_retry_timers.pop(job_id, None) is None:
+        # Stopped while waiting
+        return
+    job = db.get_job(job_id)
+    update_job_status(job_id, {'retry_at': None})
+    submit_job(job_id, job['job_name'], json.loads(job['options'] or '{}'))
+
+lane_controller = ConcurrencyController(SCHEDULER_WORKERS, adaptive=SCHEDULER_ADAPTIVE)
+scheduler = JobScheduler(handle_result, finish_job)
+scheduler.add_lane('thread', run_thread_lane, lambda: lane_controller.level)
+scheduler.add_lane('process', run_process_lane, lambda: SCHEDULER_PROCESSES)
+
+def submit_job(job_id, job_name, options):
+    """Schedule a job's pending URLs, leased from the job_urls table, on the shared lanes"""
+    counts = db.get_job_url_counts(job_id)
+    total = sum(counts.values())
+    processed = counts['done'] + counts['failed']
+    
+    status = jobs.setdefault(job_id, new_job_status(job_id, job_name))
+    status_updates.track(job_id, status)
+    
+    # A token made by start_scraping (or an earlier round) may already be stopped
+    token = job_tokens.setdefault(job_id, orchestrator.CancellationToken())
+    if token.cancelled:
+        drop_stopped_job(job_id)
+        return
+    job_clocks[job_id] = (time.time(), processed)
+    
+    # Update initial status; a resumed job starts from what was already finished
+    update_job_status(job_id, {
+        'is_running': True,
+        'total': total,
+        'processed': processed,
+        'successful': counts['done'],
+        'failed': counts['failed'],
+        'failures': db.get_job_failure_counts(job_id),
+        'progress': round(processed / total * 100, 1) if total else 0,
+        'priority': options.get('priority', 0),
+        'concurrency': lane_controller.level
+    })
     
-    all_links = []
+    backend = 'process' if options.get('backend') == 'process' else 'thread'
+    if backend == 'thread':
+        # Every lane thread may need a browser at once
+        driver_pool.get_pool().ensure_capacity(lane_controller.maximum)
+    
+    scheduler.submit(ScheduledJob(
+        job_id,
+        db.iter_job_urls(job_id),
+        priority=options.get('priority', 0),
+        weight=options.get('weight', 1.0),
+        max_in_flight=options.get('max_workers')
+    ), backend)
+    if token.cancelled:
+        # Stopped while it was being submitted
+        scheduler.stop(job_id)
+
+def release_job(job_id):
+    """Drop a job's cancellation token and clock once nothing more runs for it"""
+    job_tokens.pop(job_id, None)
+    job_clocks.pop(job_id, None)
+
+def drop_stopped_job(job_id):
+    """Forget a job stopped before the scheduler took it"""
+    release_job(job_id)
+    update_job_status(job_id, {'is_running': False})
+    status_updates.untrack(job_id)
+
+def scraping_worker(job_id, links, html_content=None, options=None,
+                    refresh_ttl_hours=db.REFRESH_TTL_HOURS, force_refresh=False):
+    """Build a job's URL list, then hand the job to the scheduler"""
+    options = options or {}
+    status = jobs[job_id]
     
     # If HTML content is provided, extract links from it
-    if html_content:
-        extracted_links = extract_links_from_html(html_content)
-        all_links.extend(extracted_links)
+    extracted_links = extract_links_from_html(html_content) if html_content else []
     
-    # Add any direct links
-    all_links.extend(links)
+    # Extracted links first, then any direct links, each canonical page once
+    unique_links = urls.dedupe(itertools.chain(extracted_links, links))
     
-    if not all_links:
-        update_job_status({'is_running': False})
-        return
+    status['skipped'] = len(extracted_links) + len(links) - len(unique_links)
     
-    # Create job in database
-    job_id = db.create_job(job_name, len(all_links))
-    current_job['id'] = job_id
+    # Pages scraped recently are served from the database before they take a browser slot
+    fresh = {} if force_refresh else db.get_fresh_pages(unique_links, refresh_ttl_hours)
+    all_links = [link for link in unique_links if link not in fresh]
+    total = len(all_links)
+    status['cache_hits'] = len(fresh)
+    status['cache_saved_seconds'] = round(sum(fresh.values()), 1)
     
-    # Update initial status
-    update_job_status({
-        'is_running': True,
-        'total': len(all_links),
-        'processed': 0,
-        'successful': 0,
-        'failed': 0,
-        'progress': 0
-    })
+    # Persist the URL list so the job survives a restart
+    db.add_job_urls(job_id, all_links)
+    db.update_job_status(job_id, total_urls=total, cache_hits=len(fresh))
     
-    # Process links with threading
-    with ThreadPoolExecutor(max_workers=3) as executor:
-        futures = []
-        for link in all_links:
-            futures.append(executor.submit(process_single_url, link, job_id))
-        
-        for future in as_completed(futures):
-            try:
-                result = future.result()
-                if result:
-                    # Save to database
-                    data_id = db.save_scraped_data(job_id, result)
-                    if data_id:
-                        result['id'] = data_id
-                        socketio.emit('new_data', result)
-                        
-                        # Update status
-                        current_job['successful'] += 1
-                    else:
-                        current_job['failed'] += 1
-                else:
-                    current_job['failed'] += 1
-                
-                current_job['processed'] += 1
-                
-                # Calculate progress
-                progress = (current_job['processed'] / current_job['total']) * 100
-                current_job['progress'] = round(progress, 1)
-                
-                # Calculate speed (items per minute)
-                if current_job['processed'] > 0:
-                    elapsed_time = time.time() - start_time
-                    current_job['speed'] = round((current_job['processed'] / elapsed_time) * 60, 1)
-                
-                # Emit status update
-                update_job_status({})
-                
-            except Exception as e:
-                print(f"Error in future: {e}")
-                current_job['failed'] += 1
-                current_job['processed'] += 1
-                update_job_status({})
-    
-    # Mark job as completed
-    db.update_job_status(
-        job_id,
-        status='completed',
-        completed_at=datetime.now().isoformat()
-    )
+    token = job_tokens.get(job_id)
+    if token is not None and token.cancelled:
+        # /api/stop came in while the list was being built
+        drop_stopped_job(job_id)
+        return
     
-    # Final cleanup
-    update_job_status({'is_running': False})
-    close_driver()
-
-def process_single_url(url, job_id):
-    """Process a single URL and return data"""
-    update_job_status({'current_url': url})
+    if not total:
+        db.update_job_status(job_id, status='completed', completed_at=datetime.now().isoformat())
+        release_job(job_id)
+        update_job_status(job_id, {'is_running': False})
+        status_updates.untrack(job_id)
+        return
     
+    submit_job(job_id, status['job_name'], options)
+
+def scrape_url(url, cancel=None, queued_at=None):
+    """Scrape a URL and record how long it took, and waited since `queued_at`; safe to run in a worker process"""
     start_time = time.time()
-    data = scrape_facebook_page(url)
+    data = scrape_facebook_page(url, cancel)
     elapsed = time.time() - start_time
     
     if data:
         data['scrape_time'] = round(elapsed, 2)
-        return data
-    
-    # Save failed attempt to database
-    db.save_scraped_data(job_id, {
+        if queued_at is not None:
+            data['phase_timings']['queue_wait'] = round(max(0.0, start_time - queued_at), 4)
+    return data
+
+def save_failed_url(job_id, url, error=None):
+    """Save failed attempt to database, with the kind of failure"""
+    failure = failures.from_error(error)
+    db.queue_scraped_data(job_id, {
         'page_link': url,
         'name': '',
         'status': 'failed',
-        'error_message': 'Failed to scrape page'
+        'error_message': failure.message or str(failure),
+        'failure_kind': failure.kind
     })
+
+def process_single_url(url, job_id, cancel=None, queued_at=None):
+    """Process a single URL and return data; raises Cancelled if its job was stopped"""
+    if cancel is not None:
+        cancel.raise_if_cancelled()
+    update_job_status(job_id, {'current_url': url})
+    
+    try:
+        data = scrape_url(url, cancel, queued_at)
+    except orchestrator.Cancelled:
+        raise
+    except Exception as e:
+        # Recorded with its kind so the URL can be retried, then reported by the lane
+        save_failed_url(job_id, url, e)
+        raise
+    if data:
+        return data
+    if cancel is not None:
+        cancel.raise_if_cancelled()
     
+    save_failed_url(job_id, url)
     return None
 
+def resume_interrupted_jobs():
+    """Reschedule jobs a previous process left running"""
+    resumed = []
+    for job in db.get_interrupted_jobs():
+        if not sum(db.get_job_url_counts(job['id']).values()):
+            # Started before URL lists were persisted; nothing to resume from
+            db.update_job_status(
+                job['id'],
+                status='failed',
+                completed_at=datetime.now().isoformat(),
+                error_message='Interrupted before its URL list was saved'
+            )
+            continue
+        print(f"Resuming interrupted job {job['id']}: {job['job_name']}")
+        submit_job(job['id'], job['job_name'], job['options'])
+        resumed.append(job['id'])
+    return resumed
+
 # Flask Routes
 @app.route('/')
 def index():
     """Render main page"""
     return render_template('index2.html')
 
+def parse_refresh_options(options):
+    """Read (refresh_ttl_hours, force_refresh) from request options; a null TTL accepts any stored page"""
+    ttl = options.get('refresh_ttl_hours', db.REFRESH_TTL_HOURS)
+    if ttl is not None:
+        try:
+            ttl = max(0.0, float(ttl))
+        except (TypeError, ValueError):
+            ttl = db.REFRESH_TTL_HOURS
+    return ttl, bool(options.get('force_refresh', False))
+
+def parse_schedule_options(options):
+    """Read priority/weight from request options; returns (priority, weight)"""
+    try:
+        priority = int(options.get('priority') or 0)
+    except (TypeError, ValueError):
+        priority = 0
+    try:
+        weight = float(options.get('weight') or 1.0)
+    except (TypeError, ValueError):
+        weight = 1.0
+    return priority, weight if weight > 0 else 1.0
+
+def parse_export_time(value, end=False):
+    """Parse an ISO date/datetime into a scraped_at bound, exclusive if `end`; raises ValueError if malformed"""
+    try:
+        day = date.fromisoformat(value)
+    except ValueError:
+        moment = datetime.fromisoformat(value)
+        # SQLite stores scraped_at in UTC, so naive times are taken as UTC
+        if moment.tzinfo is not None:
+            moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+        # An end time covers its whole second, as an end date covers its whole day
+        if end:
+            moment = moment.replace(microsecond=0) + timedelta(seconds=1)
+    else:
+        moment = datetime.combine(day + timedelta(days=1) if end else day, datetime.min.time())
+    return moment.strftime(db.TIMESTAMP_FORMAT)
+
 @app.route('/api/scrape', methods=['POST'])
 def start_scraping():
-    """Start scraping process"""
-    global current_job
-    
-    if current_job['is_running']:
-        return jsonify({'error': 'Scraping already in progress'}), 400
-    
+    """Start a scraping job; any number of jobs can run at once"""
     data = request.json
     links = data.get('links', [])
     html_content = data.get('html_content', '')
     job_name = data.get('job_name', 'Scraping Job')
-    
-    # Start scraping in background thread
+    backend = 'process' if data.get('backend') == 'process' else 'thread'
+    
+    # Jobs share their lane's concurrency controller, so adaptivity is a server
+    # setting (SCRAPER_ADAPTIVE) that only the thread lane has
+    if 'adaptive' in data and bool(data['adaptive']) != (backend == 'thread' and lane_controller.adaptive):
+        message = f'adaptive={bool(data["adaptive"])} is not available for the {backend} backend on this server'
+        return jsonify({'error': message}), 400
+    
+    # Only cap a job's share of its lane when the client asks for it
+    max_workers = parse_worker_options(data)[0] if data.get('max_workers') is not None else None
+    priority, weight = parse_schedule_options(data)
+    refresh_ttl_hours, force_refresh = parse_refresh_options(data)
+    options = {'max_workers': max_workers, 'backend': backend, 'priority': priority, 'weight': weight}
+    
+    # Create the job up front so its id can be returned straight away
+    job_id = db.create_job(job_name, 0, options)
+    jobs[job_id] = new_job_status(job_id, job_name)
+    jobs[job_id].update({'is_running': True, 'priority': priority})
+    job_tokens[job_id] = orchestrator.CancellationToken()
+    status_updates.track(job_id, jobs[job_id])
+    set_current_job(jobs[job_id])
+    
+    # Build the URL list in a background thread; the scheduler takes it from there
     thread = threading.Thread(
         target=scraping_worker, 
-        args=(links, html_content, job_name)
+        args=(job_id, links, html_content, options, refresh_ttl_hours, force_refresh)
     )
     thread.daemon = True
     thread.start()
@@ -379,24 +567,37 @@ def start_scraping():
     return jsonify({
         'message': 'Scraping started', 
         'status': 'processing',
-        'job_id': current_job.get('id')
+        'job_id': job_id
     })
 
 @app.route('/api/stop', methods=['POST'])
 def stop_scraping():
-    """Stop scraping process"""
-    global current_job
+    """Stop a job (`job_id` in the body, default the current one), leaving its unscraped URLs pending"""
+    job_id = (request.get_json(silent=True) or {}).get('job_id') or current_job['id']
     
-    if current_job['id']:
+    if job_id:
         db.update_job_status(
-            current_job['id'],
+            job_id,
             status='stopped',
             completed_at=datetime.now().isoformat(),
             error_message='Stopped by user'
         )
-    
-    update_job_status({'is_running': False})
-    return jsonify({'message': 'Scraping stopped'})
+        # Pages being loaded give up at their next check or the page-load timeout
+        token = job_tokens.get(job_id)
+        if token is not None:
+            token.cancel()
+        timer = job_retry_timers.pop(job_id, None)
+        if timer is not None:
+            # Waiting to retry; its requeued URLs stay pending
+            timer.cancel()
+            release_job(job_id)
+            update_job_status(job_id, {'is_running': False, 'retry_at': None})
+            status_updates.untrack(job_id)
+        elif not scheduler.stop(job_id):
+            update_job_status(job_id, {'is_running': False})
+            status_updates.flush(job_id)
+    
+    return jsonify({'message': 'Scraping stopped', 'job_id': job_id})
 
 @app.route('/api/status')
 def get_status():
@@ -405,43 +606,132 @@ def get_status():
 
 @app.route('/api/jobs')
 def get_jobs():
-    """Get all scraping jobs"""
+    """Get overall job stats plus the live status of every scheduled job"""
     try:
-        # This would require adding a function to database.py to get all jobs
-        # For now, return current job info
         stats = db.get_job_stats()
         return jsonify({
             'current_job': current_job,
+            'active_jobs': [jobs[job.job_id] for job in scheduler.active_jobs() if job.job_id in jobs],
             'stats': stats
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/jobs/<int:job_id>')
+def get_job(job_id):
+    """Get one job: live status if this process ran it, else its stored row, plus URL states"""
+    try:
+        job = jobs.get(job_id) or db.get_job(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(dict(
+            job,
+            urls=db.get_job_url_counts(job_id),
+            failures=db.get_job_failure_counts(job_id),
+            phases=db.get_phase_summary(job_id)
+        ))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/metrics')
+def get_metrics():
+    """Per-phase latency histograms and page counters in the Prometheus text format"""
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
 @app.route('/api/data')
 def get_data():
-    """Get scraped data"""
+    """Get scraped data, as keyset pages when `after` is passed (empty for the first page)"""
     try:
         job_id = request.args.get('job_id', type=int)
-        limit = request.args.get('limit', 100, type=int)
-        offset = request.args.get('offset', 0, type=int)
+        limit = max(1, min(request.args.get('limit', 100, type=int), MAX_DATA_LIMIT))
+        
+        if 'after' in request.args:
+            try:
+                data, next_cursor = db.get_scraped_data_page(
+                    job_id, limit, request.args.get('after') or None
+                )
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            return jsonify({'data': data, 'next_cursor': next_cursor})
         
+        offset = request.args.get('offset', 0, type=int)
         data = db.get_scraped_data(job_id, limit, offset)
         return jsonify(data)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/data/<int:data_id>/contacts')
+def get_contacts(data_id):
+    """Get every ranked email/phone/website candidate found on a scraped page"""
+    try:
+        return jsonify(db.get_contact_candidates(data_id))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def generate_csv(rows):
+    """Stream rows as CSV, one chunk of lines at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(db.EXPORT_COLUMNS)
+    
+    for i, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if i % db.EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    
+    yield buffer.getvalue()
+
+def generate_ndjson(rows):
+    """Stream rows as newline-delimited JSON"""
+    for row in rows:
+        yield json.dumps(dict(zip(db.EXPORT_COLUMNS, row))) + '\n'
+
 @app.route('/api/export')
 def export_data():
-    """Export data as Excel file"""
+    """Export data as a streamed CSV/NDJSON download or an Excel file, filtered by job_id, since and until"""
     try:
+        export_format = request.args.get('format', 'xlsx').lower()
         job_id = request.args.get('job_id', type=int)
-        filename = db.export_to_excel()
+        try:
+            since = request.args.get('since')
+            since = parse_export_time(since) if since else None
+            until = request.args.get('until')
+            until = parse_export_time(until, end=True) if until else None
+        except ValueError as e:
+            return jsonify({'error': f'since/until must be ISO dates or datetimes: {e}'}), 400
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        
+        if export_format in ('csv', 'ndjson'):
+            rows = db.iter_export_rows(job_id, since, until)
+            if export_format == 'csv':
+                body, mimetype = generate_csv(rows), 'text/csv'
+            else:
+                body, mimetype = generate_ndjson(rows), 'application/x-ndjson'
+            
+            return Response(
+                stream_with_context(body),
+                mimetype=mimetype,
+                headers={
+                    'Content-Disposition': f'attachment; filename=facebook_data_{timestamp}.{export_format}'
+                }
+            )
+        
+        if export_format != 'xlsx':
+            return jsonify({'error': f'Unsupported export format: {export_format}'}), 400
+        
+        fd, filename = tempfile.mkstemp(suffix='.xlsx')
+        os.close(fd)
+        db.export_to_excel(filename, job_id, since, until)
         
-        return send_file(
+        response = send_file(
             filename,
             as_attachment=True,
-            download_name=f'facebook_data_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
+            download_name=f'facebook_data_{timestamp}.xlsx'
         )
+        response.call_on_close(lambda: os.remove(filename))
+        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -450,18 +740,7 @@ def clear_data():
     """Clear all scraped data"""
     try:
         db.clear_all_data()
-        global current_job
-        current_job = {
-            'id': None,
-            'is_running': False,
-            'processed': 0,
-            'total': 0,
-            'successful': 0,
-            'failed': 0,
-            'current_url': '',
-            'progress': 0,
-            'speed': 0
-        }
+        set_current_job(new_job_status())
         return jsonify({'message': 'Data cleared successfully'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -504,12 +783,34 @@ def handle_connect():
     print('Client connected')
     emit('status_update', current_job)
 
+@socketio.on('join_job')
+def handle_join_job(data):
+    """Send a job's full 'job_status', then subscribe the client to its 'job_status_diff' updates"""
+    job_id = (data or {}).get('job_id')
+    if job_id:
+        join_room(job_room(job_id))
+        if job_id in jobs:
+            emit('job_status', jobs[job_id])
+
+@socketio.on('leave_job')
+def handle_leave_job(data):
+    """Unsubscribe the client from a job's updates"""
+    job_id = (data or {}).get('job_id')
+    if job_id:
+        leave_room(job_room(job_id))
+
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle client disconnection"""
     print('Client disconnected')
 
 if __name__ == '__main__':
+    # Start browsers ahead of the first job
+    driver_pool.warm_up_in_background()
+    
+    # Pick up jobs that were running when the last process stopped
+    resume_interrupted_jobs()
+    
     print("Starting Facebook Page Scraper UI...")
     print("Database initialized: facebook_scraper.db")
     print("Open your browser and go to: http://localhost:5000")
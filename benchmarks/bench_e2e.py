@@ -0,0 +1,229 @@
+# benchmarks/bench_e2e.py
+"""Measure scraping throughput end to end without touching Facebook.
+
+Runs a real job through app2's pipeline (scraping_worker, the scheduler,
+scrape_facebook_page, the batched database writer and finish_job) in a
+temporary directory. With the default selenium engine the driver pool
+hands out FakeWebDrivers, which read pages from the local fixture server
+or replay a recording made with fake_driver.py; the http engine fetches
+from the fixture server directly.
+
+Reports pages/min, p50/p95/p99 page latency (the sum of a page's recorded
+phase timings), per-phase medians, peak RSS and the database write rate.
+Each run is saved as JSON under benchmarks/results/ and compared with the
+last saved run that used the same settings.
+
+Usage: python benchmarks/bench_e2e.py [--pages N] [--workers N] [--latency S]
+       [--failure-rate P] [--crash-rate P] [--replay recording.json] ...
+"""
+import os
+import sys
+import json
+import time
+import glob
+import argparse
+import resource
+import tempfile
+import subprocess
+import statistics
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+# Settings that must match for two runs to be compared
+COMPARED_SETTINGS = (
+    'pages', 'workers', 'engine', 'extract', 'backend', 'latency', 'jitter',
+    'failure_rate', 'crash_rate', 'server_latency', 'replay',
+)
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Offline end-to-end scraping benchmark')
+    parser.add_argument('--pages', type=int, default=300, help='pages in the job')
+    parser.add_argument('--workers', type=int, default=8, help='scheduler worker threads')
+    parser.add_argument('--engine', choices=('selenium', 'http'), default='selenium')
+    parser.add_argument('--extract', choices=('elements', 'bundle'), default='elements',
+                        help='how SeleniumFetcher reads a page')
+    parser.add_argument('--backend', choices=('thread', 'process'), default='thread')
+    parser.add_argument('--latency', type=float, default=None,
+                        help='seconds per fake driver.get() (default 0.05, or the recorded time when replaying)')
+    parser.add_argument('--jitter', type=float, default=0.02, help='extra random seconds per driver.get()')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='chance a driver.get() times out')
+    parser.add_argument('--crash-rate', type=float, default=0.0, help='chance a driver.get() kills its driver')
+    parser.add_argument('--server-latency', type=float, default=0.0, help='seconds the fixture server adds per response')
+    parser.add_argument('--replay', help='recording from fake_driver.py to serve instead of the fixture server')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--label', default='', help='free text saved with the result')
+    parser.add_argument('--results-dir', default=RESULTS_DIR)
+    parser.add_argument('--no-save', action='store_true', help='print the report without saving it')
+    args = parser.parse_args(argv)
+
+    if args.engine == 'http' and args.replay:
+        parser.error('--replay needs the selenium engine')
+    if args.engine == 'selenium' and args.backend == 'process':
+        parser.error('worker processes start their own driver pool, so --backend process needs --engine http')
+    if args.latency is None and not args.replay:
+        args.latency = 0.05
+    return args
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+def peak_rss_mb():
+    """High-water resident memory of this process plus its finished children"""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return (own + children) / 1024
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+def page_urls(args, base_url, names):
+    """`args.pages` distinct URLs cycling over the available page names"""
+    return [f'{base_url}/bench/{i}/{names[i % len(names)]}' for i in range(args.pages)]
+
+def run_job(args, links):
+    """Run one job through app2's pipeline; returns the measurements"""
+    import app2
+    import database as db
+
+    writer = db.get_writer()
+    rows_before, batches_before = writer.rows_written, writer.batches_written
+
+    start_time = time.perf_counter()
+    job_id = db.create_job('bench_e2e', len(links), {'backend': args.backend})
+    app2.jobs[job_id] = app2.new_job_status(job_id, 'bench_e2e')
+    app2.status_updates.track(job_id, app2.jobs[job_id])
+    app2.scraping_worker(job_id, links, options={'backend': args.backend}, force_refresh=True)
+    while app2.jobs[job_id]['is_running']:
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - start_time
+
+    status = app2.jobs[job_id]
+    with db.get_connection() as conn:
+        rows = conn.execute(
+            'SELECT phase_timings FROM scraped_data WHERE job_id = ? AND phase_timings IS NOT NULL', (job_id,)
+        ).fetchall()
+    timings = [json.loads(row[0]) for row in rows]
+    latencies = [sum(page.values()) for page in timings]
+    phases = {}
+    for page in timings:
+        for phase, seconds in page.items():
+            phases.setdefault(phase, []).append(seconds)
+
+    rows_written = writer.rows_written - rows_before
+    return {
+        'elapsed_seconds': round(elapsed, 3),
+        'processed': status['processed'],
+        'successful': status['successful'],
+        'failed': status['failed'],
+        'pages_per_min': round(status['processed'] / elapsed * 60, 1),
+        'latency_p50': round(percentile(latencies, 0.50), 4) if latencies else None,
+        'latency_p95': round(percentile(latencies, 0.95), 4) if latencies else None,
+        'latency_p99': round(percentile(latencies, 0.99), 4) if latencies else None,
+        'phase_p50': {phase: round(statistics.median(values), 4) for phase, values in phases.items()},
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'db_rows_written': rows_written,
+        'db_batches_written': writer.batches_written - batches_before,
+        'db_rows_per_second': round(rows_written / elapsed, 1),
+    }
+
+def previous_result(results_dir, settings):
+    """The newest saved run with the same compared settings, or None"""
+    for path in sorted(glob.glob(os.path.join(results_dir, 'e2e-*.json')), reverse=True):
+        with open(path, encoding='utf-8') as f:
+            saved = json.load(f)
+        if all(saved['settings'].get(key) == settings.get(key) for key in COMPARED_SETTINGS):
+            return path, saved
+    return None
+
+def report(results, previous):
+    print(f"pages={results['processed']} ok={results['successful']} failed={results['failed']} "
+          f"in {results['elapsed_seconds']:.2f}s")
+    rows = [
+        ('pages/min', 'pages_per_min', True),
+        ('p50 s', 'latency_p50', False),
+        ('p95 s', 'latency_p95', False),
+        ('p99 s', 'latency_p99', False),
+        ('peak RSS MB', 'peak_rss_mb', False),
+        ('DB rows/s', 'db_rows_per_second', True),
+    ]
+    for label, key, higher_is_better in rows:
+        line = f"{label:12} {results[key]!s:>10}"
+        if previous and results[key] is not None and previous['results'].get(key):
+            change = (results[key] - previous['results'][key]) / previous['results'][key] * 100
+            better = (change > 0) == higher_is_better
+            line += f"  {change:+6.1f}% {'better' if better else 'worse'} than {previous['commit'] or 'last run'}"
+        print(line)
+    print('phase p50 s: ' + ', '.join(f"{phase}={seconds}" for phase, seconds in results['phase_p50'].items()))
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    settings = vars(args).copy()
+    results_dir = os.path.abspath(args.results_dir)
+
+    # Settings app2 reads when it is imported
+    os.environ['SCRAPER_FETCH_ENGINE'] = args.engine
+    os.environ['SCRAPER_SELENIUM_EXTRACT'] = args.extract
+    os.environ['SCRAPER_SCHEDULER_WORKERS'] = str(args.workers)
+
+    from fixture_server import FIXTURE_ROUTES, start_fixture_server
+    import fake_driver
+    import driver_pool
+
+    server = None
+    pages = None
+    if args.replay:
+        pages = fake_driver.load_recording(args.replay)
+        base_url, names = 'http://replay.invalid', sorted(pages)
+    else:
+        server, base_url = start_fixture_server(latency=args.server_latency)
+        names = list(FIXTURE_ROUTES)
+
+    driver_pool._pool = driver_pool.DriverPool(
+        min_size=0, max_size=args.workers, max_rss_mb=0,
+        factory=fake_driver.fake_driver_factory(
+            pages=pages, latency=args.latency, jitter=args.jitter,
+            failure_rate=args.failure_rate, crash_rate=args.crash_rate, seed=args.seed
+        )
+    )
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            # database creates its file in the working directory on import
+            os.chdir(tmp)
+            results = run_job(args, page_urls(args, base_url, names))
+            os.chdir(ROOT)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    run = {
+        'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'settings': settings,
+        'results': results,
+    }
+    previous = previous_result(results_dir, settings) if os.path.isdir(results_dir) else None
+    report(results, previous[1] if previous else None)
+
+    if not args.no_save:
+        os.makedirs(results_dir, exist_ok=True)
+        path = os.path.join(results_dir, f"e2e-{time.strftime('%Y%m%d-%H%M%S')}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(run, f, indent=2)
+        print(f"saved {os.path.relpath(path, os.getcwd())}")
+    return run
+
+if __name__ == '__main__':
+    main()
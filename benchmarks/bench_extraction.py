@@ -0,0 +1,94 @@
+# benchmarks/bench_extraction.py
+"""Compare the per-field regex searches with the single-pass extraction engine.
+
+Runs both over the saved page texts in fixtures/page_texts, scaled up to
+simulate long pages, and checks that they agree on the first match.
+
+Usage: python benchmarks/bench_extraction.py [iterations] [scale]
+"""
+import os
+import re
+import sys
+import glob
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import extraction
+
+TEXTS_DIR = os.path.join(ROOT, 'benchmarks', 'fixtures', 'page_texts')
+
+def load_corpus(scale):
+    """Load page texts, padding each with filler to `scale` times its size"""
+    corpus = []
+    filler = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 20 + "\n"
+    for path in sorted(glob.glob(os.path.join(TEXTS_DIR, '*.txt'))):
+        with open(path, encoding='utf-8') as f:
+            text = f.read()
+        corpus.append(filler * (scale - 1) + text + filler * (scale - 1))
+    return corpus
+
+# The per-field searches the apps used before the single-pass engine
+LEGACY_PATTERNS = {
+    'email': re.compile(extraction.EMAIL_PATTERN, re.IGNORECASE),
+    'phone': [re.compile(pattern) for pattern in extraction.PHONE_PATTERNS],
+    'website': re.compile(r'(https?://[^\s]+|www\.[^\s]+)'),
+    'likes': re.compile(r'(\d+[,.]?\d*)\s*(likes|people\s+like\s+this)', re.IGNORECASE),
+    'followers': re.compile(r'(\d+[,.]?\d*)\s*(followers|people\s+follow\s+this)', re.IGNORECASE)
+}
+
+def legacy_phone(text):
+    """The first PHONE_PATTERNS entry that matches anywhere, normalized"""
+    for pattern in LEGACY_PATTERNS['phone']:
+        match = pattern.search(text)
+        if match:
+            return extraction.normalize_phone(''.join(g for g in match.groups() if g))
+    return ""
+
+def legacy_extract(text):
+    """The old extraction: one search per field"""
+    email = LEGACY_PATTERNS['email'].search(text)
+    website = LEGACY_PATTERNS['website'].search(text)
+    likes = LEGACY_PATTERNS['likes'].search(text)
+    followers = LEGACY_PATTERNS['followers'].search(text)
+    return {
+        'email': email.group(0) if email else "",
+        'phone': legacy_phone(text),
+        'website': website.group(0) if website else "",
+        'likes': likes.group(1) if likes else "",
+        'followers': followers.group(1) if followers else "",
+    }
+
+def timed(func, corpus, iterations):
+    start_time = time.perf_counter()
+    for _ in range(iterations):
+        for text in corpus:
+            func(text)
+    return time.perf_counter() - start_time
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    scale = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    corpus = load_corpus(scale)
+    total_kb = sum(len(text) for text in corpus) / 1024
+
+    for text in corpus:
+        old = legacy_extract(text)
+        new = extraction.extract_fields(text)
+        for field in extraction.FIELDS:
+            if old[field] != new[field]:
+                print(f"  differs on {field}: legacy={old[field]!r} single-pass={new[field]!r}")
+
+    old_elapsed = timed(legacy_extract, corpus, iterations)
+    new_elapsed = timed(extraction.extract_fields, corpus, iterations)
+
+    pages = iterations * len(corpus)
+    print(f"pages={pages} corpus={len(corpus)} texts, {total_kb:.0f} KB")
+    print(f"legacy per-field searches: {old_elapsed:8.3f}s {pages / old_elapsed:10.0f} pages/s")
+    print(f"single-pass scanner:       {new_elapsed:8.3f}s {pages / new_elapsed:10.0f} pages/s")
+    print(f"speedup: {old_elapsed / new_elapsed:.2f}x")
+
+if __name__ == '__main__':
+    main()
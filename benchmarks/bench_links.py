@@ -0,0 +1,83 @@
+# benchmarks/bench_links.py
+"""Compare the BeautifulSoup link extractor with the streaming one.
+
+Generates a synthetic saved search-results page with `anchors` result
+blocks (a mix of page, profile, group and unrelated links wrapped in the
+nested markup Facebook saves) and times both extractors on it, reporting
+peak traced memory and checking that they find the same links.
+
+Usage: python benchmarks/bench_links.py [anchors] [iterations]
+"""
+import os
+import sys
+import time
+import random
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import urls
+
+HREFS = (
+    'https://www.facebook.com/page.{n}/',
+    'https://facebook.com/profile.php?id=1000{n}',
+    'https://www.facebook.com/groups/group{n}',
+    'https://www.facebook.com/pages/Shop-{n}/12345{n}',
+    '/photo.php?fbid={n}&amp;set=a.{n}',
+    'https://l.facebook.com/l.php?u=https%3A%2F%2Fexample{n}.com',
+    'https://www.facebook.com/hashtag/food{n}?__eep__=6',
+)
+
+def synthetic_html(anchors, seed=1):
+    """Build a search-results page with `anchors` links"""
+    rng = random.Random(seed)
+    parts = ['<!DOCTYPE html><html><head><title>Search results</title>',
+             '<script>', 'var x = "<a href=\\"https://www.facebook.com/fake\\">";' * 50, '</script>',
+             '</head><body><div role="feed">']
+    for n in range(anchors):
+        href = rng.choice(HREFS).format(n=rng.randrange(anchors // 2 or 1))
+        parts.append(
+            f'<div class="x1yztbdb"><div class="x78zum5"><span dir="auto">'
+            f'<a class="x1i10hfl" href="{href}" role="link" tabindex="0">'
+            f'<span>Result {n} &amp; friends</span></a></span>'
+            f'<div class="xu06os2"><span>Bakery &middot; Karachi &middot; {n} likes</span></div>'
+            f'<img src="https://scontent.xx.fbcdn.net/v/t39/{n}.jpg" alt=""/></div></div>'
+        )
+    parts.append('</div></body></html>')
+    return ''.join(parts)
+
+def measure(func, html, iterations):
+    """Best wall time over `iterations` runs plus peak traced memory of one run"""
+    best = float('inf')
+    for _ in range(iterations):
+        start_time = time.perf_counter()
+        result = func(html)
+        best = min(best, time.perf_counter() - start_time)
+
+    tracemalloc.start()
+    func(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, best, peak
+
+def main():
+    anchors = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    html = synthetic_html(anchors)
+    print(f"html={len(html) / 1024 / 1024:.1f} MB anchors={anchors}")
+
+    soup_links, soup_time, soup_peak = measure(urls.extract_links_soup, html, iterations)
+    stream_links, stream_time, stream_peak = measure(urls.extract_links_streaming, html, iterations)
+
+    if set(soup_links) != set(stream_links):
+        print(f"  link sets differ: soup={len(soup_links)} streaming={len(stream_links)}")
+
+    print(f"links found: {len(stream_links)}")
+    print(f"BeautifulSoup: {soup_time:8.3f}s peak {soup_peak / 1024 / 1024:8.1f} MB")
+    print(f"streaming:     {stream_time:8.3f}s peak {stream_peak / 1024 / 1024:8.1f} MB")
+    print(f"speedup: {soup_time / stream_time:.2f}x, memory: {soup_peak / max(stream_peak, 1):.0f}x less")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# benchmarks/bench_persistence.py
+"""Compare per-row save_scraped_data against the batched ScrapedDataWriter.
+
+Usage: python benchmarks/bench_persistence.py [rows] [workers]
+"""
+import os
+import sys
+import time
+import tempfile
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def make_row(i):
+    """Build a synthetic scraped page"""
+    return {
+        'name': f'Page {i}',
+        'email': f'contact{i}@example.com',
+        'phone': f'92300{i:07d}',
+        'country': 'Pakistan',
+        'page_link': f'https://www.facebook.com/page{i}',
+        'website': f'https://example{i}.com',
+        'location': '',
+        'address': f'{i} Main Street',
+        'likes': i,
+        'followers': i * 2,
+        'scrape_time': 1.5
+    }
+
+def run_workers(workers, rows, target):
+    """Split rows across worker threads calling target(i)"""
+    def work(start):
+        for i in range(start, rows, workers):
+            target(i)
+    
+    threads = [threading.Thread(target=work, args=(w,)) for w in range(workers)]
+    start_time = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start_time
+
+def count_rows(db):
+    with db.get_connection() as conn:
+        return conn.execute('SELECT COUNT(*) FROM scraped_data').fetchone()[0]
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        import database as db
+        
+        job_id = db.create_job('bench', rows)
+        
+        old_elapsed = run_workers(
+            workers, rows, lambda i: db.save_scraped_data(job_id, make_row(i))
+        )
+        old_count = count_rows(db)
+        db.clear_all_data()
+        
+        job_id = db.create_job('bench', rows)
+        writer = db.get_writer()
+        
+        def batched():
+            elapsed = run_workers(
+                workers, rows, lambda i: db.queue_scraped_data(job_id, make_row(i))
+            )
+            db.flush_scraped_data()
+            return elapsed
+        
+        start_time = time.perf_counter()
+        enqueue_elapsed = batched()
+        new_elapsed = time.perf_counter() - start_time
+        new_count = count_rows(db)
+        writer.close()
+        
+        print(f"rows={rows} workers={workers}")
+        print(f"save_scraped_data (per-row commit): {old_elapsed:8.2f}s "
+              f"{rows / old_elapsed:10.0f} rows/s  stored={old_count}")
+        print(f"ScrapedDataWriter (batched):        {new_elapsed:8.2f}s "
+              f"{rows / new_elapsed:10.0f} rows/s  stored={new_count} "
+              f"batches={writer.batches_written} enqueue={enqueue_elapsed:.2f}s")
+        print(f"speedup: {old_elapsed / new_elapsed:.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# benchmarks/bench_profiles.py
+"""Report what each Selenium load profile costs and whether it still finds the fields.
+
+For every profile in driver_pool.LOAD_PROFILES, and each way SeleniumFetcher
+can read a page (per-element calls or the single-script bundle), a measuring
+driver loads each URL and reads it. Per combination it reports
+the median and worst time-to-extract, the median bytes transferred per page
+(from Chrome's performance log) and how many pages still yielded each field,
+so the cheapest profile that keeps the fields can be picked.
+
+With no URLs the local fixture server is used; pass real page URLs to
+measure images, video and third-party scripts. Needs Chrome and
+chromedriver.
+
+Usage: python benchmarks/bench_profiles.py [url ...]
+"""
+import os
+import sys
+import time
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import driver_pool
+import extraction
+import fetchers
+from fixture_server import FIXTURE_ROUTES, start_fixture_server
+
+REPORTED_FIELDS = ('email', 'phone', 'website', 'likes', 'followers')
+EXTRACT_MODES = ('elements', 'bundle')
+
+def measure_profile(name, page_urls, extract):
+    """Load every URL with one driver; returns (seconds, bytes, fields) lists per page"""
+    driver = driver_pool.create_driver(name, measure=True)
+    if driver is None:
+        raise RuntimeError(f"Could not start Chrome for profile {name!r}")
+
+    fetcher = fetchers.SeleniumFetcher(extract)
+    timings, sizes, found = [], [], []
+    try:
+        for url in page_urls:
+            driver.get("about:blank")
+            driver_pool.transferred_bytes(driver)
+
+            start_time = time.perf_counter()
+            try:
+                page = fetcher.snapshot(driver, url)
+            except fetchers.ScrapeFailure as e:
+                print(f"  {name}/{extract}: {url} failed: {e}")
+                page = None
+            fields = extraction.extract_fields(page['text']) if page else {}
+            timings.append(time.perf_counter() - start_time)
+
+            sizes.append(driver_pool.transferred_bytes(driver))
+            found.append({field for field in REPORTED_FIELDS if fields.get(field)})
+    finally:
+        driver.quit()
+    return timings, sizes, found
+
+def main():
+    page_urls = sys.argv[1:]
+    server = None
+    if not page_urls:
+        server, base_url = start_fixture_server()
+        page_urls = [f'{base_url}/{name}' for name in FIXTURE_ROUTES]
+
+    try:
+        print(f"pages={len(page_urls)}")
+        print(f"{'profile':10} {'extract':9} {'median s':>9} {'max s':>7} {'median KB':>10}  fields found")
+        for name in driver_pool.LOAD_PROFILES:
+            for extract in EXTRACT_MODES:
+                timings, sizes, found = measure_profile(name, page_urls, extract)
+                counts = ', '.join(
+                    f"{field}={sum(1 for page in found if field in page)}" for field in REPORTED_FIELDS
+                )
+                print(f"{name:10} {extract:9} {statistics.median(timings):9.3f} {max(timings):7.3f} "
+                      f"{statistics.median(sizes) / 1024:10.1f}  {counts}")
+    finally:
+        if server is not None:
+            server.shutdown()
+
+if __name__ == '__main__':
+    main()
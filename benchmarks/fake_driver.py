@@ -0,0 +1,181 @@
+# benchmarks/fake_driver.py
+"""A stand-in for Selenium's Chrome WebDriver, for benchmarks without a browser.
+
+FakeWebDriver implements the calls SeleniumFetcher and DriverPool make
+(get, find_element(s), execute_async_script, current_url, quit). Pages
+come either from the network, parsed the way the HTTP engine parses them
+(point it at benchmarks/fixture_server.py), or from a recording made with
+record_pages() against a real browser. Latency, timeouts and driver
+crashes can be injected.
+
+Pages are looked up by the last segment of the URL path, like the fixture
+server does, so any number of distinct URLs can replay a few recorded pages.
+
+Usage: python benchmarks/fake_driver.py recording.json url [url ...]
+"""
+import os
+import sys
+import json
+import time
+import random
+import threading
+
+import requests
+from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import driver_pool
+import fetchers
+
+# Page fields a recording keeps
+RECORDED_FIELDS = ('text', 'title', 'address', 'links', 'meta')
+
+def page_key(url):
+    """Recording key of a URL: the last segment of its path"""
+    return url.split('?', 1)[0].rstrip('/').rsplit('/', 1)[-1].lower()
+
+class FakeElement:
+    def __init__(self, text):
+        self.text = text
+
+class FakeWebDriver:
+    """Serves pages without a browser; see the module docstring.
+
+    `pages` maps page_key()s to recorded pages; without it each URL is
+    fetched over HTTP. Every get() sleeps `latency` seconds plus up to
+    `jitter` more (a recorded page's own 'navigation' time when latency is
+    None), then raises TimeoutException with probability `failure_rate`.
+    With probability `crash_rate` the driver dies instead and every later
+    call fails, as a crashed chromedriver does.
+    """
+
+    def __init__(self, pages=None, latency=None, jitter=0.0, failure_rate=0.0, crash_rate=0.0,
+                 seed=None, session=None):
+        self.pages = pages
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.crash_rate = crash_rate
+        self.random = random.Random(seed)
+        self.session = session or requests.Session()
+        self.page = None
+        self.crashed = False
+        self.closed = False
+        self._url = 'about:blank'
+
+    def _check_alive(self):
+        if self.crashed or self.closed:
+            raise WebDriverException('chrome not reachable')
+
+    @property
+    def current_url(self):
+        self._check_alive()
+        return self._url
+
+    def get(self, url):
+        self._check_alive()
+        self._url = url
+        if url == 'about:blank':
+            self.page = None
+            return
+
+        recorded = self.pages.get(page_key(url)) if self.pages is not None else None
+        latency = self.latency
+        if latency is None:
+            latency = recorded.get('navigation', 0.0) if recorded else 0.0
+        time.sleep(latency + self.random.uniform(0, self.jitter))
+
+        roll = self.random.random()
+        if roll < self.crash_rate:
+            self.crashed = True
+            raise WebDriverException('chrome not reachable (injected crash)')
+        if roll < self.crash_rate + self.failure_rate:
+            raise TimeoutException(f'Timed out receiving message from renderer (injected): {url}')
+
+        if self.pages is not None:
+            page = fetchers.new_page(url, fetchers.SeleniumFetcher.name)
+            if recorded:
+                page.update({field: recorded[field] for field in RECORDED_FIELDS if field in recorded})
+            self.page = page
+        else:
+            response = self.session.get(url, timeout=fetchers.HTTP_TIMEOUT)
+            self.page = fetchers.parse_html(url, response.text if response.ok else '')
+
+    def find_element(self, by, value):
+        self._check_alive()
+        if self.page is not None:
+            if by == By.TAG_NAME and value == 'body':
+                return FakeElement(self.page['text'])
+            if by == By.XPATH and value == '//h1 | //title' and self.page['title']:
+                return FakeElement(self.page['title'])
+        raise NoSuchElementException(f'{by}={value}')
+
+    def find_elements(self, by, value):
+        self._check_alive()
+        if self.page is not None and by == By.XPATH and value == fetchers.LOCATION_XPATH and self.page['address']:
+            return [FakeElement(self.page['address'])]
+        return []
+
+    def execute_async_script(self, script, *args):
+        self._check_alive()
+        if self.page is None:
+            return None
+        bundle = {field: self.page[field] for field in RECORDED_FIELDS}
+        bundle['waited'] = 0
+        self.page = None
+        return bundle
+
+    def quit(self):
+        self.closed = True
+
+def fake_driver_factory(**options):
+    """DriverPool factory making FakeWebDrivers; each gets its own seed from `seed`"""
+    seeds = random.Random(options.pop('seed', None))
+    lock = threading.Lock()
+
+    def factory():
+        with lock:
+            seed = seeds.random()
+        return FakeWebDriver(seed=seed, **options)
+    return factory
+
+def record_pages(page_urls, path, factory=None):
+    """Load each URL in a real driver (or factory()) and save what it read to a JSON recording"""
+    driver = (factory or driver_pool.create_driver)()
+    if driver is None:
+        raise RuntimeError('Could not start a driver to record with')
+
+    fetcher = fetchers.SeleniumFetcher('elements')
+    pages = {}
+    try:
+        for url in page_urls:
+            try:
+                page = fetcher.snapshot(driver, url)
+            except fetchers.ScrapeFailure as e:
+                print(f"Not recorded: {url} ({e})")
+                continue
+            recorded = {field: page[field] for field in RECORDED_FIELDS}
+            recorded['url'] = url
+            recorded['navigation'] = round(page['timings'].get('navigation', 0.0), 4)
+            pages[page_key(url)] = recorded
+    finally:
+        driver.quit()
+
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'pages': pages}, f, indent=2)
+    return pages
+
+def load_recording(path):
+    """Pages of a record_pages() recording, keyed by page_key()"""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['pages']
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
+    recorded = record_pages(sys.argv[2:], sys.argv[1])
+    print(f"Recorded {len(recorded)} pages to {sys.argv[1]}")
@@ -0,0 +1,75 @@
+# benchmarks/fixture_server.py
+"""Local stand-in for Facebook that serves saved fixture pages.
+
+Any path is mapped to a fixture by its last segment (`/karachi.bakery`
+serves `pages/static_page.html` via FIXTURE_ROUTES, unknown names fall back
+to `<name>.html`). Responses are gzip-compressed when the client asks.
+
+Usage: python benchmarks/fixture_server.py [port]
+"""
+import os
+import sys
+import gzip
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'pages')
+
+FIXTURE_ROUTES = {
+    'karachi.bakery': 'static_page.html',
+    'dubai.auto.spares': 'uae_page.html',
+    'js.rendered': 'js_rendered_page.html',
+}
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Serves fixture pages; `latency` seconds are added to every response"""
+
+    latency = 0.0
+    pages_dir = PAGES_DIR
+
+    def do_GET(self):
+        name = self.path.split('?', 1)[0].rstrip('/').rsplit('/', 1)[-1]
+        filename = FIXTURE_ROUTES.get(name, f'{name}.html')
+        path = os.path.join(self.pages_dir, filename)
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+
+        with open(path, 'rb') as f:
+            body = f.read()
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_fixture_server(port=0, latency=0.0, pages_dir=PAGES_DIR):
+    """Start the server on a background thread; returns (server, base_url)"""
+    handler = type('Handler', (FixtureHandler,), {'latency': latency, 'pages_dir': pages_dir})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    server, base_url = start_fixture_server(port)
+    print(f"Serving fixtures from {PAGES_DIR} at {base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,111 @@
+# concurrency.py
+import os
+import time
+import threading
+from collections import deque
+
+DEFAULT_WORKERS = 3
+MAX_WORKERS_LIMIT = int(os.environ.get('SCRAPER_MAX_WORKERS', (os.cpu_count() or 1) * 2))
+
+# Adaptive mode tuning
+ADAPT_WINDOW = 20                # completed pages per adjustment
+ADAPT_MAX_ERROR_RATE = 0.2       # shrink above this failure ratio
+ADAPT_LATENCY_TOLERANCE = 1.5    # shrink when latency exceeds best seen by this factor
+ADAPT_MIN_FREE_MEMORY_PCT = 15   # shrink when less host memory than this is available
+
+def available_memory_pct():
+    """Percentage of host memory available, or None if it cannot be read"""
+    try:
+        values = {}
+        with open('/proc/meminfo') as f:
+            for line in f:
+                key, value = line.split(':', 1)
+                values[key] = int(value.split()[0])
+        return values['MemAvailable'] * 100 / values['MemTotal']
+    except (OSError, KeyError, ValueError):
+        return None
+
+def parse_worker_options(options):
+    """Read max_workers/adaptive from a /api/scrape request body"""
+    try:
+        workers = int(options.get('max_workers') or DEFAULT_WORKERS)
+    except (TypeError, ValueError):
+        workers = DEFAULT_WORKERS
+    workers = max(1, min(workers, MAX_WORKERS_LIMIT))
+    adaptive = bool(options.get('adaptive', False))
+    return workers, adaptive
+
+class ConcurrencyController:
+    """Gate that limits how many pages are scraped at once.
+
+    In fixed mode the level never changes. In adaptive mode the level grows by
+    one after every window of pages whose latency and error rate stay healthy,
+    and is halved when errors spike, latency degrades or host memory runs low.
+    """
+
+    def __init__(self, initial=DEFAULT_WORKERS, adaptive=False, minimum=1,
+                 maximum=MAX_WORKERS_LIMIT, window=ADAPT_WINDOW):
+        self.adaptive = adaptive
+        self.minimum = minimum
+        self.maximum = maximum if adaptive else initial
+        self.level = max(minimum, min(initial, self.maximum))
+        self.window = window
+        self.active = 0
+        self._samples = deque(maxlen=window)
+        self._best_latency = None
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.active >= self.level:
+                self._cond.wait()
+            self.active += 1
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+
+    def run(self, func, *args, **kwargs):
+        """Call func inside a concurrency slot and record its outcome"""
+        self.acquire()
+        start_time = time.time()
+        result = None
+        try:
+            result = func(*args, **kwargs)
+            return result
+        finally:
+            self.release()
+            self.record(time.time() - start_time, result is not None)
+
+    def record(self, latency, ok):
+        """Feed one page outcome to the adaptive controller"""
+        if not self.adaptive:
+            return
+        with self._cond:
+            self._samples.append((latency, ok))
+            if len(self._samples) < self.window:
+                return
+            samples = list(self._samples)
+            self._samples.clear()
+            self._adjust(samples)
+            self._cond.notify_all()
+
+    def _adjust(self, samples):
+        latencies = sorted(latency for latency, _ in samples)
+        median = latencies[len(latencies) // 2]
+        error_rate = sum(1 for _, ok in samples if not ok) / len(samples)
+        memory_pct = available_memory_pct()
+
+        if self._best_latency is None or median < self._best_latency:
+            self._best_latency = median
+
+        overloaded = (
+            error_rate > ADAPT_MAX_ERROR_RATE or
+            median > self._best_latency * ADAPT_LATENCY_TOLERANCE or
+            (memory_pct is not None and memory_pct < ADAPT_MIN_FREE_MEMORY_PCT)
+        )
+        if overloaded:
+            self.level = max(self.minimum, self.level // 2)
+        elif self.level < self.maximum:
+            self.level += 1
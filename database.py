@@ -1,13 +1,170 @@
 # database.py
 import sqlite3
 import os
+import time
+import queue
+import json
+import atexit
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 
+import metrics
+
 DB_NAME = 'facebook_scraper.db'
 
+# Batched writer settings: flush after this many rows or this many milliseconds
+WRITER_BATCH_SIZE = int(os.environ.get('DB_WRITER_BATCH_SIZE', 500))
+WRITER_FLUSH_MS = int(os.environ.get('DB_WRITER_FLUSH_MS', 250))
+WRITER_QUEUE_SIZE = int(os.environ.get('DB_WRITER_QUEUE_SIZE', 10000))
+
+# Pages scraped within this many hours are served from the database instead of re-fetched
+REFRESH_TTL_HOURS = float(os.environ.get('SCRAPER_REFRESH_TTL_HOURS', 24))
+
+# Job URL queue: URLs leased per round trip, and attempts before a URL is given up on
+JOB_URL_LEASE_SIZE = int(os.environ.get('DB_JOB_URL_LEASE_SIZE', 16))
+JOB_URL_MAX_ATTEMPTS = int(os.environ.get('DB_JOB_URL_MAX_ATTEMPTS', 3))
+
+# Connection pool settings
+POOL_MAX_CONNECTIONS = int(os.environ.get('DB_POOL_MAX_CONNECTIONS', 16))
+BUSY_TIMEOUT_SECONDS = 30
+STATEMENT_CACHE_SIZE = 256
+
+# Applied to every connection; WAL lets readers run alongside the writer
+CONNECTION_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA cache_size=-65536',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA temp_store=MEMORY',
+)
+
+# Re-scraping a page updates its row in place so its id (and anything keyed on it) survives
+SCRAPED_DATA_INSERT = '''
+INSERT INTO scraped_data 
+(job_id, name, email, phone, country, page_link, website, location, address, likes, followers, scrape_time,
+ phase_timings)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (page_link) DO UPDATE SET
+    job_id = excluded.job_id, name = excluded.name, email = excluded.email,
+    phone = excluded.phone, country = excluded.country, website = excluded.website,
+    location = excluded.location, address = excluded.address, likes = excluded.likes,
+    followers = excluded.followers, scrape_time = excluded.scrape_time,
+    phase_timings = excluded.phase_timings, scraped_at = CURRENT_TIMESTAMP, status = 'success',
+    error_message = NULL, failure_kind = NULL
+'''
+
+# A failed attempt records why, but keeps whatever an earlier successful scrape stored
+SCRAPED_DATA_FAILURE_INSERT = '''
+INSERT INTO scraped_data (job_id, name, page_link, status, error_message, failure_kind)
+VALUES (?, '', ?, 'failed', ?, ?)
+ON CONFLICT (page_link) DO UPDATE SET
+    job_id = excluded.job_id, status = 'failed', error_message = excluded.error_message,
+    failure_kind = excluded.failure_kind, scraped_at = CURRENT_TIMESTAMP
+'''
+
+# A re-scraped page's candidates are replaced wholesale
+CONTACT_CANDIDATES_DELETE = '''
+DELETE FROM contact_candidates
+WHERE data_id IN (SELECT id FROM scraped_data WHERE page_link = ?)
+'''
+
+CONTACT_CANDIDATES_INSERT = '''
+INSERT OR REPLACE INTO contact_candidates (data_id, kind, value, score, occurrences)
+SELECT id, ?, ?, ?, ? FROM scraped_data WHERE page_link = ?
+'''
+
+# Finishing a job URL rides in the same transaction as its scraped_data row
+JOB_URL_FINISH = '''
+UPDATE job_urls SET state = ?, failure_kind = ?, updated_at = CURRENT_TIMESTAMP
+WHERE job_id = ? AND url = ? AND state != 'done'
+'''
+
+def _connect():
+    """Open a new connection configured with the tuned pragmas"""
+    conn = sqlite3.connect(
+        DB_NAME,
+        timeout=BUSY_TIMEOUT_SECONDS,
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE
+    )
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+class ConnectionPool:
+    """Thread-aware pool of long-lived SQLite connections; nested checkouts on a thread reuse one"""
+
+    def __init__(self, max_connections=POOL_MAX_CONNECTIONS):
+        self.max_connections = max_connections
+        self._idle = []
+        self._all = []
+        self._local = threading.local()
+        self._cond = threading.Condition()
+
+    def _acquire(self):
+        with self._cond:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if len(self._all) < self.max_connections:
+                    conn = _connect()
+                    self._all.append(conn)
+                    return conn
+                self._cond.wait()
+
+    def _release(self, conn):
+        with self._cond:
+            if conn in self._all:
+                self._idle.append(conn)
+            else:
+                conn.close()
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection, committing on success and rolling back on error"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            yield conn
+            return
+        
+        conn = self._acquire()
+        self._local.conn = conn
+        try:
+            yield conn
+            if conn.in_transaction:
+                conn.commit()
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            self._local.conn = None
+            self._release(conn)
+
+    def close_all(self):
+        """Close every idle connection and forget the busy ones"""
+        with self._cond:
+            for conn in self._idle:
+                conn.close()
+            self._idle = []
+            self._all = []
+
+_pool = ConnectionPool()
+
+atexit.register(_pool.close_all)
+
+def _add_missing_columns(cursor, table, columns):
+    """Add columns an older database file does not have yet"""
+    existing = {row[1] for row in cursor.execute(f'PRAGMA table_info({table})')}
+    for name, definition in columns.items():
+        if name not in existing:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {name} {definition}')
+
 def init_database():
     """Initialize the database with required tables"""
-    conn = sqlite3.connect(DB_NAME)
+    conn = _connect()
     cursor = conn.cursor()
     
     # Create scraping_jobs table
@@ -22,7 +179,9 @@ def init_database():
         failed_urls INTEGER DEFAULT 0,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         completed_at TIMESTAMP,
-        error_message TEXT
+        error_message TEXT,
+        cache_hits INTEGER DEFAULT 0,
+        options TEXT
     )
     ''')
     
@@ -45,79 +204,281 @@ def init_database():
         scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         status TEXT DEFAULT 'success',
         error_message TEXT,
+        phase_timings TEXT,
+        failure_kind TEXT,
         FOREIGN KEY (job_id) REFERENCES scraping_jobs (id)
     )
     ''')
     
+    # Every email/phone/website found on a page, ranked; scraped_data keeps the best
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS contact_candidates (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        data_id INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        value TEXT NOT NULL,
+        score REAL DEFAULT 0,
+        occurrences INTEGER DEFAULT 1,
+        UNIQUE (data_id, kind, value),
+        FOREIGN KEY (data_id) REFERENCES scraped_data (id)
+    )
+    ''')
+    
+    # Every URL a job has to scrape, so an interrupted job can be resumed
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS job_urls (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        job_id INTEGER NOT NULL,
+        url TEXT NOT NULL,
+        state TEXT DEFAULT 'pending',
+        attempts INTEGER DEFAULT 0,
+        leased_at TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        failure_kind TEXT,
+        UNIQUE (job_id, url),
+        FOREIGN KEY (job_id) REFERENCES scraping_jobs (id)
+    )
+    ''')
+    
+    # Columns added after the first release
+    _add_missing_columns(cursor, 'scraping_jobs', {'cache_hits': 'INTEGER DEFAULT 0', 'options': 'TEXT'})
+    _add_missing_columns(cursor, 'scraped_data', {'phase_timings': 'TEXT', 'failure_kind': 'TEXT'})
+    _add_missing_columns(cursor, 'job_urls', {'failure_kind': 'TEXT'})
+    
     # Create indexes for better performance
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_page_link ON scraped_data(page_link)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_job_id ON scraped_data(job_id)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_scraped_at ON scraped_data(scraped_at)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_status ON scraped_data(status)')
     
+    # Composite indexes backing keyset pagination on (scraped_at, id)
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_scraped_at_id ON scraped_data(scraped_at, id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_job_scraped_at_id ON scraped_data(job_id, scraped_at, id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_contact_data_id ON contact_candidates(data_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_job_urls_state ON job_urls(job_id, state)')
+    
     conn.commit()
     conn.close()
     
     print(f"Database initialized: {DB_NAME}")
 
 def get_connection():
-    """Get a database connection"""
-    return sqlite3.connect(DB_NAME)
+    """Check out a pooled connection; use as `with get_connection() as conn:`"""
+    return _pool.connection()
+
+def _scraped_data_params(job_id, data):
+    """Build the INSERT parameters for a scraped_data row"""
+    return (
+        job_id,
+        data.get('name', ''),
+        data.get('email', ''),
+        data.get('phone', ''),
+        data.get('country', ''),
+        data.get('page_link', ''),
+        data.get('website', ''),
+        data.get('location', ''),
+        data.get('address', ''),
+        data.get('likes', 0) if data.get('likes') else 0,
+        data.get('followers', 0) if data.get('followers') else 0,
+        data.get('scrape_time', 0.0),
+        json.dumps(data['phase_timings']) if data.get('phase_timings') else None
+    )
+
+def _contact_params(data):
+    """Build the contact_candidates INSERT parameters for a scraped page"""
+    page_link = data.get('page_link', '')
+    return [
+        (candidate['kind'], candidate['value'], candidate['score'], candidate['occurrences'], page_link)
+        for candidate in data.get('contacts') or ()
+    ]
+
+def _failure_params(job_id, data):
+    """Build the failed-attempt INSERT parameters for a scraped_data row"""
+    return (
+        job_id,
+        data.get('page_link', ''),
+        data.get('error_message') or 'Failed to scrape page',
+        data.get('failure_kind')
+    )
+
+def _write_rows(conn, batch):
+    """Upsert (job_id, data) rows and their contact candidates on conn"""
+    # Failures only record the failure, and go first so a success for the same page in the batch wins
+    failed = [(job_id, data) for job_id, data in batch if data.get('status') == 'failed']
+    scraped = [(job_id, data) for job_id, data in batch if data.get('status') != 'failed']
+    if failed:
+        conn.executemany(SCRAPED_DATA_FAILURE_INSERT, [_failure_params(job_id, data) for job_id, data in failed])
+    if scraped:
+        links = [(data.get('page_link', ''),) for _, data in scraped]
+        contacts = [params for _, data in scraped for params in _contact_params(data)]
+        conn.executemany(CONTACT_CANDIDATES_DELETE, links)
+        conn.executemany(SCRAPED_DATA_INSERT, [_scraped_data_params(job_id, data) for job_id, data in scraped])
+        if contacts:
+            conn.executemany(CONTACT_CANDIDATES_INSERT, contacts)
+    conn.executemany(JOB_URL_FINISH, [
+        ('failed', data.get('failure_kind'), job_id, data.get('page_link', '')) for job_id, data in failed
+    ] + [
+        ('done', None, job_id, data.get('page_link', '')) for job_id, data in scraped
+    ])
 
 def save_scraped_data(job_id, data):
     """Save scraped data to database"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
     try:
-        cursor.execute('''
-        INSERT OR REPLACE INTO scraped_data 
-        (job_id, name, email, phone, country, page_link, website, location, address, likes, followers, scrape_time)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            job_id,
-            data.get('name', ''),
-            data.get('email', ''),
-            data.get('phone', ''),
-            data.get('country', ''),
-            data.get('page_link', ''),
-            data.get('website', ''),
-            data.get('location', ''),
-            data.get('address', ''),
-            data.get('likes', 0) if data.get('likes') else 0,
-            data.get('followers', 0) if data.get('followers') else 0,
-            data.get('scrape_time', 0.0)
-        ))
-        
-        conn.commit()
-        return cursor.lastrowid
+        with get_connection() as conn:
+            _write_rows(conn, [(job_id, data)])
+            row = conn.execute(
+                'SELECT id FROM scraped_data WHERE page_link = ?', (data.get('page_link', ''),)
+            ).fetchone()
+            return row[0] if row else None
     except sqlite3.Error as e:
         print(f"Database error: {e}")
         return None
-    finally:
-        conn.close()
 
-def create_job(job_name="Default Job", total_urls=0):
-    """Create a new scraping job"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-    INSERT INTO scraping_jobs (job_name, total_urls, status)
-    VALUES (?, ?, 'running')
-    ''', (job_name, total_urls))
-    
-    job_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    
-    return job_id
+class ScrapedDataWriter:
+    """Single writer thread that commits queued scraped_data rows in batches"""
+
+    _STOP = object()
+
+    def __init__(self, batch_size=WRITER_BATCH_SIZE, flush_ms=WRITER_FLUSH_MS,
+                 max_queue=WRITER_QUEUE_SIZE):
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000.0
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.rows_written = 0
+        self.batches_written = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the writer thread if it is not already running"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='scraped-data-writer', daemon=True
+                )
+                self._thread.start()
+        return self
+
+    def put(self, job_id, data, timeout=None):
+        """Queue a row for writing, blocking while the queue is full"""
+        self.start()
+        self.queue.put((job_id, data), timeout=timeout)
+
+    def flush(self, timeout=None):
+        """Block until every row queued before this call is committed; False if `timeout` passes first"""
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        # The marker queues behind those rows, so rows queued after it are not waited for
+        marker = threading.Event()
+        self.queue.put(marker)
+        return marker.wait(timeout)
+
+    def close(self):
+        """Flush pending rows and stop the writer thread"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self.queue.put(self._STOP)
+            thread.join()
+
+    def _run(self):
+        # The writer owns a dedicated connection outside the pool
+        conn = _connect()
+        try:
+            while True:
+                batch = []
+                markers = []
+                stop = False
+                item = self.queue.get()
+                if item is self._STOP:
+                    self.queue.task_done()
+                    break
+                if isinstance(item, threading.Event):
+                    markers.append(item)
+                else:
+                    batch.append(item)
+                deadline = time.monotonic() + self.flush_interval
+                while not markers and len(batch) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self.queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    if item is self._STOP:
+                        stop = True
+                        break
+                    if isinstance(item, threading.Event):
+                        # A flush() is waiting; commit what we have now
+                        markers.append(item)
+                        break
+                    batch.append(item)
+
+                if batch:
+                    self._write_batch(conn, batch)
+                for marker in markers:
+                    marker.set()
+                for _ in range(len(batch) + len(markers)):
+                    self.queue.task_done()
+                if stop:
+                    self.queue.task_done()
+                    break
+        finally:
+            conn.close()
+
+    def _write_batch(self, conn, batch):
+        start_time = time.perf_counter()
+        try:
+            with conn:
+                _write_rows(conn, batch)
+            self.rows_written += len(batch)
+            self.batches_written += 1
+            
+            # A row's share of its batch commit; the row itself cannot carry this phase
+            per_row = (time.perf_counter() - start_time) / len(batch)
+            for job_id, _ in batch:
+                metrics.registry.observe('db_write', per_row, job_id)
+        except sqlite3.Error as e:
+            # Retry row by row so one bad row does not lose the whole batch
+            print(f"Database writer error: {e}")
+            for row in batch:
+                try:
+                    with conn:
+                        _write_rows(conn, [row])
+                    self.rows_written += 1
+                except sqlite3.Error as row_error:
+                    print(f"Database writer error for {row[1].get('page_link', '')}: {row_error}")
+
+_writer = ScrapedDataWriter()
+
+def get_writer():
+    """Get the process-wide scraped_data writer"""
+    return _writer
+
+def queue_scraped_data(job_id, data):
+    """Queue scraped data for batched persistence by the writer thread"""
+    _writer.put(job_id, data)
+
+def flush_scraped_data(timeout=None):
+    """Wait until the scraped data queued so far has been committed"""
+    return _writer.flush(timeout)
+
+atexit.register(_writer.close)
+
+def create_job(job_name="Default Job", total_urls=0, options=None):
+    """Create a new scraping job; `options` are kept as JSON for resuming it"""
+    with get_connection() as conn:
+        cursor = conn.execute('''
+        INSERT INTO scraping_jobs (job_name, total_urls, status, options)
+        VALUES (?, ?, 'running', ?)
+        ''', (job_name, total_urls, json.dumps(options or {})))
+        
+        return cursor.lastrowid
 
 def update_job_status(job_id, **kwargs):
     """Update job status and statistics"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
     update_fields = []
     values = []
     
@@ -132,73 +493,237 @@ def update_job_status(job_id, **kwargs):
         SET {', '.join(update_fields)}
         WHERE id = ?
         '''
-        cursor.execute(query, values)
-        conn.commit()
-    
-    conn.close()
+        with get_connection() as conn:
+            conn.execute(query, values)
+
+def get_job(job_id):
+    """Get a job row as a dictionary, or None"""
+    with get_connection() as conn:
+        rows = _rows_to_dicts(conn.execute('SELECT * FROM scraping_jobs WHERE id = ?', (job_id,)))
+    return rows[0] if rows else None
 
 def get_job_status(job_id):
     """Get job status"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT * FROM scraping_jobs WHERE id = ?', (job_id,))
-    job = cursor.fetchone()
-    
-    conn.close()
-    return job
+    with get_connection() as conn:
+        return conn.execute('SELECT * FROM scraping_jobs WHERE id = ?', (job_id,)).fetchone()
+
+def add_job_urls(job_id, urls):
+    """Persist a job's URL list as pending entries"""
+    with get_connection() as conn:
+        conn.executemany(
+            'INSERT OR IGNORE INTO job_urls (job_id, url) VALUES (?, ?)',
+            ((job_id, url) for url in urls)
+        )
+
+def lease_job_urls(job_id, limit=JOB_URL_LEASE_SIZE):
+    """Mark up to `limit` pending URLs of a job in progress and return them"""
+    with get_connection() as conn:
+        # SELECT then UPDATE under one write lock; UPDATE ... RETURNING needs SQLite 3.35
+        if not conn.in_transaction:
+            conn.execute('BEGIN IMMEDIATE')
+        rows = conn.execute('''
+        SELECT id, url FROM job_urls WHERE job_id = ? AND state = 'pending' ORDER BY id LIMIT ?
+        ''', (job_id, limit)).fetchall()
+        conn.executemany('''
+        UPDATE job_urls
+        SET state = 'in_progress', attempts = attempts + 1,
+            leased_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+        ''', [(row_id,) for row_id, _ in rows])
+        return [url for _, url in rows]
+
+def iter_job_urls(job_id, lease_size=JOB_URL_LEASE_SIZE):
+    """Yield a job's pending URLs, leasing them a few at a time as they are consumed"""
+    while True:
+        urls = lease_job_urls(job_id, lease_size)
+        if not urls:
+            return
+        yield from urls
+
+def finish_unleased_job_urls(job_id, state='failed'):
+    """Close out URLs still in progress once a job's run has ended"""
+    with get_connection() as conn:
+        conn.execute('''
+        UPDATE job_urls SET state = ?, updated_at = CURRENT_TIMESTAMP
+        WHERE job_id = ? AND state = 'in_progress'
+        ''', (state, job_id))
+
+def requeue_failed_job_urls(job_id, kinds, max_attempts=JOB_URL_MAX_ATTEMPTS):
+    """Put a job's failed URLs of these kinds back to pending; returns (requeued, most attempts)"""
+    if not kinds:
+        return 0, 0
+    placeholders = ','.join('?' * len(kinds))
+    where = f"job_id = ? AND state = 'failed' AND attempts < ? AND failure_kind IN ({placeholders})"
+    params = (job_id, max_attempts, *kinds)
+    with get_connection() as conn:
+        # As in lease_job_urls, no UPDATE ... RETURNING before SQLite 3.35
+        if not conn.in_transaction:
+            conn.execute('BEGIN IMMEDIATE')
+        attempts = [row[0] for row in conn.execute(f'SELECT attempts FROM job_urls WHERE {where}', params)]
+        conn.execute(f"UPDATE job_urls SET state = 'pending', updated_at = CURRENT_TIMESTAMP WHERE {where}", params)
+    return len(attempts), max(attempts, default=0)
+
+def get_job_failure_counts(job_id):
+    """Count a job's failed URLs per kind of failure"""
+    with get_connection() as conn:
+        return dict(conn.execute('''
+        SELECT COALESCE(failure_kind, 'error'), COUNT(*) FROM job_urls
+        WHERE job_id = ? AND state = 'failed' GROUP BY 1
+        ''', (job_id,)).fetchall())
+
+def get_job_url_counts(job_id):
+    """Count a job's URLs per state"""
+    counts = {'pending': 0, 'in_progress': 0, 'done': 0, 'failed': 0}
+    with get_connection() as conn:
+        for state, count in conn.execute(
+            'SELECT state, COUNT(*) FROM job_urls WHERE job_id = ? GROUP BY state', (job_id,)
+        ):
+            counts[state] = count
+    return counts
+
+def get_interrupted_jobs(max_attempts=JOB_URL_MAX_ATTEMPTS):
+    """Find jobs left running by a previous process and put their in-progress URLs back to pending"""
+    with get_connection() as conn:
+        cursor = conn.execute('''
+        SELECT id, job_name, options FROM scraping_jobs WHERE status = 'running' ORDER BY id
+        ''')
+        jobs = _rows_to_dicts(cursor)
+        for job in jobs:
+            # A URL tried max_attempts times fails instead, so a page that kills the process cannot do so forever
+            conn.execute('''
+            UPDATE job_urls
+            SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE job_id = ? AND state = 'in_progress'
+            ''', (max_attempts, job['id']))
+            job['options'] = json.loads(job['options'] or '{}')
+    return jobs
+
+def _rows_to_dicts(cursor):
+    """Convert fetched rows to dictionaries using the cursor's column names"""
+    columns = [col[0] for col in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+def get_phase_summary(job_id):
+    """Average and maximum seconds per phase over a job's scraped pages"""
+    with get_connection() as conn:
+        cursor = conn.execute('''
+        SELECT phases.key, COUNT(*), AVG(phases.value), MAX(phases.value)
+        FROM scraped_data, json_each(scraped_data.phase_timings) AS phases
+        WHERE scraped_data.job_id = ? AND scraped_data.phase_timings IS NOT NULL
+        GROUP BY phases.key
+        ''', (job_id,))
+        return {
+            phase: {'pages': pages, 'avg': round(avg, 4), 'max': round(longest, 4)}
+            for phase, pages, avg, longest in cursor.fetchall()
+        }
+
+def encode_cursor(row):
+    """Build the pagination token for a scraped_data row"""
+    return f"{row['scraped_at']},{row['id']}"
+
+def decode_cursor(token):
+    """Parse a '<scraped_at>,<id>' pagination token"""
+    scraped_at, _, row_id = token.rpartition(',')
+    if not scraped_at or not row_id.isdigit():
+        raise ValueError(f"Invalid cursor: {token!r}")
+    return scraped_at, int(row_id)
 
 def get_scraped_data(job_id=None, limit=100, offset=0):
     """Get scraped data with optional filtering"""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with get_connection() as conn:
+        if job_id:
+            cursor = conn.execute('''
+            SELECT * FROM scraped_data 
+            WHERE job_id = ? 
+            ORDER BY scraped_at DESC, id DESC 
+            LIMIT ? OFFSET ?
+            ''', (job_id, limit, offset))
+        else:
+            cursor = conn.execute("""
+            SELECT * FROM scraped_data 
+            ORDER BY scraped_at DESC, id DESC 
+            LIMIT ? OFFSET ?
+            """, (limit, offset))
+        
+        return _rows_to_dicts(cursor)
+
+def get_scraped_data_page(job_id=None, limit=100, after=None):
+    """Get one keyset page of scraped data, newest first, and the cursor of the next page"""
+    conditions = []
+    params = []
     
     if job_id:
-        cursor.execute('''
-        SELECT * FROM scraped_data 
-        WHERE job_id = ? 
-        ORDER BY scraped_at DESC 
-        LIMIT ? OFFSET ?
-        ''', (job_id, limit, offset))
-    else:
-        cursor.execute("""
-        SELECT * FROM scraped_data 
-        ORDER BY scraped_at DESC 
-        LIMIT ? OFFSET ?
-        """, (limit, offset))
+        conditions.append('job_id = ?')
+        params.append(job_id)
+    if after:
+        scraped_at, row_id = decode_cursor(after)
+        conditions.append('(scraped_at, id) < (?, ?)')
+        params.extend([scraped_at, row_id])
     
-    data = cursor.fetchall()
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    params.append(limit)
     
-    # Get column names
-    cursor.execute('PRAGMA table_info(scraped_data)')
-    columns = [col[1] for col in cursor.fetchall()]
-    
-    conn.close()
+    with get_connection() as conn:
+        cursor = conn.execute(f'''
+        SELECT * FROM scraped_data 
+        {where}
+        ORDER BY scraped_at DESC, id DESC 
+        LIMIT ?
+        ''', params)
+        rows = _rows_to_dicts(cursor)
     
-    # Convert to list of dictionaries
-    result = []
-    for row in data:
-        result.append(dict(zip(columns, row)))
+    next_cursor = encode_cursor(rows[-1]) if rows and len(rows) == limit else None
+    return rows, next_cursor
+
+def get_contact_candidates(data_id):
+    """Get every contact candidate found on a scraped page, best first"""
+    with get_connection() as conn:
+        cursor = conn.execute('''
+        SELECT kind, value, score, occurrences FROM contact_candidates
+        WHERE data_id = ?
+        ORDER BY kind, score DESC, occurrences DESC
+        ''', (data_id,))
+        return _rows_to_dicts(cursor)
+
+# SQLite limits the number of bound parameters per statement
+LOOKUP_CHUNK_SIZE = 500
+
+def get_fresh_pages(links, max_age_hours=REFRESH_TTL_HOURS):
+    """Return {page_link: scrape_time} for links scraped successfully within max_age_hours (None: any age)"""
+    links = list(links)
+    fresh = {}
+    if max_age_hours is not None and max_age_hours <= 0:
+        return fresh
+    age_condition = ''
+    age_params = []
+    if max_age_hours is not None:
+        age_condition = "AND scraped_at >= datetime('now', ?)"
+        age_params = [f'-{float(max_age_hours)} hours']
     
-    return result
+    with get_connection() as conn:
+        for start in range(0, len(links), LOOKUP_CHUNK_SIZE):
+            chunk = links[start:start + LOOKUP_CHUNK_SIZE]
+            placeholders = ','.join('?' * len(chunk))
+            cursor = conn.execute(f'''
+            SELECT page_link, scrape_time FROM scraped_data
+            WHERE page_link IN ({placeholders}) AND status != 'failed' {age_condition}
+            ''', chunk + age_params)
+            fresh.update((link, scrape_time or 0.0) for link, scrape_time in cursor)
+    return fresh
 
 def get_job_stats():
     """Get overall job statistics"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-    SELECT 
-        COUNT(*) as total_jobs,
-        SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END) as completed_jobs,
-        SUM(CASE WHEN status = 'running' THEN 1 ELSE 0 END) as running_jobs,
-        SUM(CASE WHEN status = 'failed' THEN 1 ELSE 0 END) as failed_jobs,
-        SUM(total_urls) as total_urls_scraped
-    FROM scraping_jobs
-    ''')
-    
-    stats = cursor.fetchone()
-    conn.close()
+    with get_connection() as conn:
+        stats = conn.execute('''
+        SELECT 
+            COUNT(*) as total_jobs,
+            SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END) as completed_jobs,
+            SUM(CASE WHEN status = 'running' THEN 1 ELSE 0 END) as running_jobs,
+            SUM(CASE WHEN status = 'failed' THEN 1 ELSE 0 END) as failed_jobs,
+            SUM(total_urls) as total_urls_scraped
+        FROM scraping_jobs
+        ''').fetchone()
     
     return {
         'total_jobs': stats[0] or 0,
@@ -210,37 +735,73 @@ def get_job_stats():
 
 def clear_all_data():
     """Clear all scraped data"""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with get_connection() as conn:
+        conn.execute('DELETE FROM contact_candidates')
+        conn.execute('DELETE FROM job_urls')
+        conn.execute('DELETE FROM scraped_data')
+        conn.execute('DELETE FROM scraping_jobs')
+        conn.commit()
+        
+        # VACUUM cannot run inside a transaction
+        conn.execute('VACUUM')
+
+EXPORT_COLUMNS = [
+    'name', 'email', 'phone', 'country', 'page_link', 'website',
+    'location', 'address', 'likes', 'followers', 'scrape_time',
+    'scraped_at', 'status'
+]
+EXPORT_CHUNK_SIZE = 1000
+
+# How SQLite's CURRENT_TIMESTAMP writes scraped_at (UTC)
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+def iter_export_rows(job_id=None, since=None, until=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield export rows as tuples, chunk_size at a time, with since <= scraped_at < until in TIMESTAMP_FORMAT"""
+    conditions = []
+    params = []
     
-    cursor.execute('DELETE FROM scraped_data')
-    cursor.execute('DELETE FROM scraping_jobs')
-    cursor.execute('VACUUM')
+    if job_id:
+        conditions.append('job_id = ?')
+        params.append(job_id)
+    if since:
+        conditions.append('scraped_at >= ?')
+        params.append(since)
+    if until:
+        conditions.append('scraped_at < ?')
+        params.append(until)
     
-    conn.commit()
-    conn.close()
-
-def export_to_excel(filename='facebook_data_export.xlsx'):
-    """Export data to Excel file"""
-    import pandas as pd
-    from datetime import datetime
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
     
-    conn = get_connection()
+    # A dedicated connection, so a slow consumer never holds a pooled one
+    conn = _connect()
+    try:
+        cursor = conn.execute(f'''
+        SELECT {', '.join(EXPORT_COLUMNS)}
+        FROM scraped_data
+        {where}
+        ORDER BY scraped_at DESC, id DESC
+        ''', params)
+        
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        conn.close()
+
+def export_to_excel(filename='facebook_data_export.xlsx', job_id=None, since=None, until=None):
+    """Export data to Excel file using openpyxl's write-only mode"""
+    from openpyxl import Workbook
     
-    # Read all data
-    df = pd.read_sql_query('''
-    SELECT 
-        name, email, phone, country, page_link, website, 
-        location, address, likes, followers, scrape_time,
-        scraped_at, status
-    FROM scraped_data
-    ORDER BY scraped_at DESC
-    ''', conn)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(EXPORT_COLUMNS)
     
-    conn.close()
+    for row in iter_export_rows(job_id, since, until):
+        ws.append(row)
     
-    # Save to Excel
-    df.to_excel(filename, index=False)
+    wb.save(filename)
     return filename
 
 # Initialize database when module is imported
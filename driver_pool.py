@@ -0,0 +1,376 @@
+# driver_pool.py
+import os
+import json
+import time
+import random
+import atexit
+import threading
+from functools import partial
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+# Pool sizing and recycling limits
+DRIVER_POOL_MIN = int(os.environ.get('DRIVER_POOL_MIN', 1))
+DRIVER_POOL_MAX = int(os.environ.get('DRIVER_POOL_MAX', 4))
+DRIVER_MAX_PAGES = int(os.environ.get('DRIVER_MAX_PAGES', 200))
+DRIVER_MAX_RSS_MB = int(os.environ.get('DRIVER_MAX_RSS_MB', 1024))
+
+# Upper bound on one driver.get(), so a stopped job never waits on a hung page for long
+DRIVER_PAGE_LOAD_TIMEOUT = float(os.environ.get('DRIVER_PAGE_LOAD_TIMEOUT', 30))
+
+# Upper bound on one execute_async_script(), e.g. the bundle extraction waiting for <body>
+DRIVER_SCRIPT_TIMEOUT = float(os.environ.get('DRIVER_SCRIPT_TIMEOUT', 15))
+
+# How often a cancellable acquire() re-checks its token while the pool is full
+CANCEL_POLL_SECONDS = 0.25
+
+def _extension_patterns(*extensions):
+    """URL patterns for files with these extensions, with or without a query string"""
+    return [pattern for extension in extensions for pattern in (f'*.{extension}', f'*.{extension}?*')]
+
+# URL patterns (Network.setBlockedURLs wildcards) per resource type a profile can block
+RESOURCE_TYPE_PATTERNS = {
+    'image': _extension_patterns('jpg', 'jpeg', 'png', 'gif', 'webp', 'svg', 'ico') + ['*scontent*.fbcdn.net/*'],
+    'media': _extension_patterns('mp4', 'webm', 'm3u8', 'mpd', 'mp3') + ['*video*.fbcdn.net/*'],
+    'font': _extension_patterns('woff', 'woff2', 'ttf', 'otf'),
+    'stylesheet': _extension_patterns('css'),
+    'tracker': [
+        '*google-analytics.com/*', '*googletagmanager.com/*', '*doubleclick.net/*', '*connect.facebook.net/*',
+        # The pixel endpoint only; '*facebook.com/tr*' would also block pages like /travelco
+        '*facebook.com/tr?*', '*facebook.com/tr/*', '*/ajax/bz*', '*/ajax/bulk-route-definitions*',
+    ],
+}
+
+# Chrome features a scraping browser never needs
+LEAN_ARGUMENTS = [
+    '--disable-extensions',
+    '--disable-background-networking',
+    '--disable-component-update',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--no-first-run',
+    '--mute-audio',
+    '--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication',
+]
+
+# What a driver downloads and how long driver.get() waits for, by profile name
+LOAD_PROFILES = {
+    # Chrome's defaults: everything is fetched and get() waits for the load event
+    'full': {
+        'page_load_strategy': 'normal',
+        'blocked_types': [],
+        'blocked_urls': [],
+        'arguments': [],
+        'window_size': '1920,1080',
+    },
+    # No images, media, fonts or trackers; get() returns once the DOM is parsed
+    'lean': {
+        'page_load_strategy': 'eager',
+        'blocked_types': ['image', 'media', 'font', 'tracker'],
+        'blocked_urls': [],
+        'arguments': LEAN_ARGUMENTS + ['--blink-settings=imagesEnabled=false'],
+        'window_size': '1280,800',
+    },
+    # Only the document and its scripts
+    'minimal': {
+        'page_load_strategy': 'eager',
+        'blocked_types': ['image', 'media', 'font', 'tracker', 'stylesheet'],
+        'blocked_urls': [],
+        'arguments': LEAN_ARGUMENTS + ['--blink-settings=imagesEnabled=false'],
+        'window_size': '800,600',
+    },
+}
+
+# Profile used by the pool, plus extra comma-separated URL patterns blocked on top of it
+DRIVER_LOAD_PROFILE = os.environ.get('DRIVER_LOAD_PROFILE', 'full')
+DRIVER_BLOCKED_URLS = [p for p in os.environ.get('DRIVER_BLOCKED_URLS', '').split(',') if p]
+
+def blocked_url_patterns(profile):
+    """All URL patterns a profile blocks, its resource types expanded"""
+    patterns = []
+    for resource_type in profile['blocked_types']:
+        patterns.extend(RESOURCE_TYPE_PATTERNS[resource_type])
+    patterns.extend(profile['blocked_urls'])
+    patterns.extend(DRIVER_BLOCKED_URLS)
+    return patterns
+
+def get_load_profile(name=None):
+    """Look a profile up by name, falling back to 'full' for unknown names"""
+    name = name or DRIVER_LOAD_PROFILE
+    if name not in LOAD_PROFILES:
+        print(f"Unknown load profile {name!r}, using 'full'")
+        name = 'full'
+    return LOAD_PROFILES[name]
+
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+]
+
+def create_driver(profile=None, measure=False):
+    """Create a new headless Chrome WebDriver using a load profile (name or dict).
+
+    With `measure`, Chrome's performance log is enabled so
+    transferred_bytes() can report what each page downloaded.
+    """
+    if not isinstance(profile, dict):
+        profile = get_load_profile(profile)
+    chrome_options = Options()
+    chrome_options.page_load_strategy = profile['page_load_strategy']
+
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument(f"--window-size={profile['window_size']}")
+    for argument in profile['arguments']:
+        chrome_options.add_argument(argument)
+    chrome_options.add_argument(f'user-agent={random.choice(USER_AGENTS)}')
+    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+    chrome_options.add_experimental_option('excludeSwitches', ['enable-logging', 'enable-automation'])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+    if measure:
+        chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+
+    try:
+        driver = webdriver.Chrome(options=chrome_options)
+        driver.set_page_load_timeout(DRIVER_PAGE_LOAD_TIMEOUT)
+        driver.set_script_timeout(DRIVER_SCRIPT_TIMEOUT)
+        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
+            'source': 'Object.defineProperty(navigator, "webdriver", {get: () => undefined})'
+        })
+        blocked = blocked_url_patterns(profile)
+        if blocked:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': blocked})
+        return driver
+    except Exception as e:
+        print(f"Error creating driver: {e}")
+        return None
+
+def transferred_bytes(driver):
+    """Bytes received over the network since the last call (needs create_driver(measure=True))"""
+    total = 0
+    for entry in driver.get_log('performance'):
+        message = json.loads(entry['message'])['message']
+        if message['method'] == 'Network.loadingFinished':
+            total += message['params'].get('encodedDataLength', 0)
+    return total
+
+def _read_rss_kb(pid):
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+def _child_pids(pid):
+    children = []
+    try:
+        for tid in os.listdir(f'/proc/{pid}/task'):
+            with open(f'/proc/{pid}/task/{tid}/children') as f:
+                children.extend(int(child) for child in f.read().split())
+    except OSError:
+        pass
+    return children
+
+def process_tree_rss_mb(pid):
+    """Resident memory of a process and its descendants, or None if unavailable"""
+    total_kb = 0
+    stack = [pid]
+    try:
+        while stack:
+            current = stack.pop()
+            total_kb += _read_rss_kb(current)
+            stack.extend(_child_pids(current))
+    except OSError:
+        if not total_kb:
+            return None
+    return total_kb / 1024
+
+def driver_rss_mb(driver):
+    """Resident memory of chromedriver plus the browsers it spawned"""
+    try:
+        return process_tree_rss_mb(driver.service.process.pid)
+    except AttributeError:
+        return None
+
+class DriverPool:
+    """Pool of reusable WebDriver instances shared by all scraping threads.
+
+    Drivers are created on demand up to max_size, health-checked before being
+    handed out, and quit once they have served max_pages pages or their
+    process tree exceeds max_rss_mb. shutdown() quits every driver. New
+    drivers use the `profile` load profile (DRIVER_LOAD_PROFILE by default)
+    unless a custom factory is given.
+    """
+
+    def __init__(self, min_size=DRIVER_POOL_MIN, max_size=DRIVER_POOL_MAX,
+                 max_pages=DRIVER_MAX_PAGES, max_rss_mb=DRIVER_MAX_RSS_MB,
+                 factory=None, profile=None):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.factory = factory or partial(create_driver, profile)
+        self._idle = []
+        self._pages = {}
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def _create(self):
+        """Create a driver for a slot already reserved in _size"""
+        driver = None
+        try:
+            driver = self.factory()
+        finally:
+            if driver is None:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+        if driver is not None:
+            with self._cond:
+                self._pages[id(driver)] = 0
+        return driver
+
+    def _discard(self, driver):
+        """Quit a driver and free its slot"""
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"Error quitting driver: {e}")
+        with self._cond:
+            self._pages.pop(id(driver), None)
+            self._size -= 1
+            self._cond.notify()
+
+    def _is_healthy(self, driver):
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def warm_up(self):
+        """Start drivers until min_size are available"""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            driver = self._create()
+            if driver is None:
+                return
+            with self._cond:
+                self._idle.append(driver)
+                self._cond.notify()
+
+    def acquire(self, timeout=None, cancel=None):
+        """Check out a driver, waiting while the pool is at max_size.
+
+        Returns None on timeout, or as soon as the optional cancellation
+        token `cancel` is set.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._cond:
+                while not self._idle and self._size >= self.max_size and not self._closed:
+                    if cancel is not None and cancel.cancelled:
+                        return None
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return None
+                    if cancel is not None:
+                        remaining = CANCEL_POLL_SECONDS if remaining is None else min(remaining, CANCEL_POLL_SECONDS)
+                    self._cond.wait(remaining)
+                if self._closed:
+                    return None
+                if self._idle:
+                    driver = self._idle.pop()
+                else:
+                    self._size += 1
+                    driver = None
+
+            if driver is None:
+                return self._create()
+            if self._is_healthy(driver):
+                return driver
+            self._discard(driver)
+
+    def release(self, driver, broken=False):
+        """Return a driver to the pool, recycling it if it is worn out"""
+        with self._cond:
+            pages = self._pages.get(id(driver), 0) + 1
+            self._pages[id(driver)] = pages
+            closed = self._closed
+
+        recycle = broken or closed or pages >= self.max_pages
+        if not recycle and self.max_rss_mb:
+            rss = driver_rss_mb(driver)
+            recycle = rss is not None and rss > self.max_rss_mb
+
+        if recycle:
+            self._discard(driver)
+        else:
+            with self._cond:
+                self._idle.append(driver)
+                self._cond.notify()
+
+    @contextmanager
+    def driver(self, timeout=None, cancel=None):
+        """Check out a driver for one page; yields None if none could be started"""
+        driver = self.acquire(timeout, cancel)
+        if driver is None:
+            yield None
+            return
+        try:
+            yield driver
+        except BaseException:
+            self.release(driver, broken=True)
+            raise
+        else:
+            self.release(driver)
+
+    def ensure_capacity(self, size):
+        """Raise max_size so at least `size` drivers can be checked out at once"""
+        with self._cond:
+            if size > self.max_size:
+                self.max_size = size
+                self._cond.notify_all()
+
+    def shutdown(self):
+        """Quit idle drivers now; busy ones are quit when released"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for driver in idle:
+            self._discard(driver)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Get the process-wide driver pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DriverPool()
+        return _pool
+
+def warm_up_in_background():
+    """Warm the pool up without blocking application start"""
+    thread = threading.Thread(target=get_pool().warm_up, name='driver-pool-warm-up', daemon=True)
+    thread.start()
+    return thread
+
+def shutdown_pool():
+    """Quit every pooled driver"""
+    with _pool_lock:
+        pool = _pool
+    if pool is not None:
+        pool.shutdown()
+
+atexit.register(shutdown_pool)
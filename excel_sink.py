@@ -0,0 +1,178 @@
+# excel_sink.py
+import os
+import json
+import time
+import atexit
+import threading
+from openpyxl import load_workbook, Workbook
+
+EXCEL_HEADERS = ['Name', 'Email', 'Phone', 'Country', 'Page Link', 'Website',
+                 'Location', 'Address', 'Likes', 'Followers', 'Scrape Time']
+
+# Rewrite the workbook after this many new rows or this many seconds
+CHECKPOINT_ROWS = int(os.environ.get('EXCEL_CHECKPOINT_ROWS', 500))
+CHECKPOINT_SECONDS = float(os.environ.get('EXCEL_CHECKPOINT_SECONDS', 30))
+
+class ExcelSink:
+    """Long-lived, append-only writer for a single Excel workbook.
+
+    Rows are appended to a sidecar log (`<filename>.log`, one JSON line per
+    row) and kept in memory; the workbook itself is only rewritten on a
+    checkpoint, via a temporary file and an atomic os.replace. Every log line
+    carries its row number, so rows already in the workbook are skipped when
+    the log is replayed after a crash.
+
+    The in-memory rows double as a read cache: they are reloaded only when the
+    workbook's mtime changes behind the sink's back.
+    """
+
+    def __init__(self, filename, checkpoint_rows=CHECKPOINT_ROWS,
+                 checkpoint_seconds=CHECKPOINT_SECONDS):
+        self.filename = filename
+        self.log_path = filename + '.log'
+        self.checkpoint_rows = checkpoint_rows
+        self.checkpoint_seconds = checkpoint_seconds
+        self.lock = threading.RLock()
+        self._rows = None
+        self._log = None
+        self._pending = 0
+        self._mtime = None
+        self._last_checkpoint = time.monotonic()
+
+    def _workbook_mtime(self):
+        try:
+            return os.stat(self.filename).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _load(self):
+        """Load workbook rows and replay the sidecar log (lock held)"""
+        if self._rows is not None:
+            if self._pending or self._workbook_mtime() == self._mtime:
+                return
+            # The workbook was replaced externally; drop the cached rows
+            self._log.close()
+            self._rows = None
+
+        mtime = self._workbook_mtime()
+
+        rows = []
+        if os.path.exists(self.filename):
+            wb = load_workbook(self.filename, read_only=True)
+            try:
+                for i, row in enumerate(wb.active.iter_rows(values_only=True)):
+                    if i == 0 and row and row[0] == EXCEL_HEADERS[0]:
+                        continue
+                    rows.append(list(row))
+            finally:
+                wb.close()
+
+        checkpointed = len(rows)
+        if os.path.exists(self.log_path):
+            with open(self.log_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A torn final line from a crash mid-write
+                        continue
+                    if entry['n'] >= checkpointed:
+                        rows.append(entry['row'])
+
+        self._rows = rows
+        self._mtime = mtime
+        self._pending = len(rows) - checkpointed
+        self._log = open(self.log_path, 'a', encoding='utf-8')
+
+    def append(self, row):
+        """Append one row; checkpoints the workbook when due"""
+        with self.lock:
+            self._load()
+            self._log.write(json.dumps({'n': len(self._rows), 'row': row}, default=str) + '\n')
+            self._log.flush()
+            self._rows.append(row)
+            self._pending += 1
+
+            if (self._pending >= self.checkpoint_rows or
+                    time.monotonic() - self._last_checkpoint >= self.checkpoint_seconds):
+                self.checkpoint()
+
+    def checkpoint(self):
+        """Rewrite the workbook atomically and truncate the sidecar log"""
+        with self.lock:
+            self._load()
+            if self._pending == 0 and os.path.exists(self.filename):
+                self._last_checkpoint = time.monotonic()
+                return
+
+            wb = Workbook(write_only=True)
+            ws = wb.create_sheet()
+            ws.append(EXCEL_HEADERS)
+            for row in self._rows:
+                ws.append(row)
+
+            tmp_path = self.filename + '.tmp'
+            wb.save(tmp_path)
+            with open(tmp_path, 'rb') as f:
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.filename)
+            self._mtime = self._workbook_mtime()
+
+            self._log.truncate(0)
+            self._pending = 0
+            self._last_checkpoint = time.monotonic()
+
+    def rows(self):
+        """Return a snapshot of all rows, including uncheckpointed ones"""
+        with self.lock:
+            self._load()
+            return list(self._rows)
+
+    def records(self, offset=0, limit=None):
+        """Return a slice of rows as dictionaries keyed by EXCEL_HEADERS"""
+        with self.lock:
+            self._load()
+            end = None if limit is None else offset + limit
+            rows = self._rows[offset:end]
+        return [dict(zip(EXCEL_HEADERS, row)) for row in rows]
+
+    def clear(self):
+        """Drop all rows and write an empty workbook with headers"""
+        with self.lock:
+            self._load()
+            self._rows = []
+            self._pending = 1
+            self.checkpoint()
+
+    def close(self):
+        """Checkpoint pending rows and close the sidecar log"""
+        with self.lock:
+            if self._rows is None:
+                return
+            self.checkpoint()
+            self._log.close()
+            self._log = None
+            self._rows = None
+
+_sinks = {}
+_sinks_lock = threading.Lock()
+
+def get_sink(filename):
+    """Get the process-wide sink for a workbook"""
+    path = os.path.abspath(filename)
+    with _sinks_lock:
+        if path not in _sinks:
+            _sinks[path] = ExcelSink(filename)
+        return _sinks[path]
+
+def close_all():
+    """Checkpoint and close every open sink"""
+    with _sinks_lock:
+        sinks = list(_sinks.values())
+    for sink in sinks:
+        try:
+            sink.close()
+        except Exception as e:
+            print(f"Error closing Excel sink {sink.filename}: {e}")
+
+atexit.register(close_all)
@@ -0,0 +1,202 @@
+# extraction.py
+import re
+
+EMAIL_PATTERN = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+PHONE_PATTERNS = [
+    r'(?:\+92|0092|92)?[-\s]?(3\d{2})[-\s]?(\d{7})',
+    r'(0?3\d{2})[-\s]?(\d{7})',
+    r'(0?3\d{2})\s?(\d{3}\s?\d{4})',
+    r'(\(0?3\d{2}\))\s?(\d{7})',
+    r'(?:\+971|00971|971)?[-\s]?(\d)[-\s]?(\d{3})[-\s]?(\d{4})',
+]
+WEBSITE_PATTERN = r'https?://[^\s]+|www\.[^\s]+'
+
+# Likes and followers share the leading count, so they are one branch. The
+# count and its label must be on one line, or a phone at the end of a line
+# followed by "people like this" would be taken for a count.
+COUNT_PATTERN = (
+    r'(?P<count>\d+[,.]?\d*)[^\S\n]*'
+    r'(?:(?P<likes>(?i:likes|people\s+like\s+this))'
+    r'|(?P<followers>(?i:followers|people\s+follow\s+this)))'
+)
+
+# Counts and phones are only tried where a digit, '+' or '(' starts. Besides
+# letting every other position skip those branches at once, this stops a
+# phone pattern's optional leading separator from starting a match one
+# character early and swallowing a better match that begins at the digit.
+NUMERIC_GATE = r'(?=[\d+(])'
+
+FIELDS = ('email', 'phone', 'website', 'likes', 'followers')
+
+NON_PHONE_CHARS = re.compile(r'[^\d+]')
+
+# Each phone variant on its own, for matches the scanner gave to another branch
+PHONE_REGEXES = [re.compile(pattern) for pattern in PHONE_PATTERNS]
+
+def _build_scanner():
+    """Compile every field into one alternation.
+
+    Where two branches could match at the same position the earlier one
+    wins: counts come before phones because a bare 8-digit count would
+    otherwise match the UAE phone pattern.
+    """
+    phones = '|'.join(f'(?P<phone{i}>{pattern})' for i, pattern in enumerate(PHONE_PATTERNS))
+    scanner = re.compile(
+        f'(?P<email>(?i:{EMAIL_PATTERN}))'
+        f'|(?P<website>{WEBSITE_PATTERN})'
+        f'|{NUMERIC_GATE}(?:{COUNT_PATTERN}|{phones})'
+    )
+    # Group numbers of each phone variant's own captures, joined into the number
+    phone_groups = {}
+    for i, pattern in enumerate(PHONE_PATTERNS):
+        start = scanner.groupindex[f'phone{i}']
+        phone_groups[f'phone{i}'] = (i, range(start + 1, start + 1 + re.compile(pattern).groups))
+    return scanner, phone_groups
+
+SCANNER, PHONE_GROUPS = _build_scanner()
+
+def normalize_phone(phone):
+    """Normalize phone number"""
+    if not phone:
+        return ""
+    cleaned = NON_PHONE_CHARS.sub('', phone)
+    return cleaned if len(cleaned) >= 8 else ""
+
+def scan(text):
+    """Scan text once and return every match per field.
+
+    Returns {field: [match, ...]} where each match is a dict with the
+    'value' (normalized for phones, the raw count for likes/followers), its
+    'start'/'end' offsets and, for phones, the index of the PHONE_PATTERNS
+    'variant' that matched. Matches never overlap, so text consumed by one
+    field (e.g. an email inside a URL) is not reported again for another.
+    """
+    found = {field: [] for field in FIELDS}
+    if not text:
+        return found
+
+    for match in SCANNER.finditer(text):
+        group = match.lastgroup
+        variant = 0
+        if group == 'email' or group == 'website':
+            field, value = group, match.group(0)
+        elif group == 'likes' or group == 'followers':
+            field, value = group, match.group('count')
+        else:
+            field = 'phone'
+            variant, inner = PHONE_GROUPS[group]
+            value = normalize_phone(''.join(g for g in (match.group(i) for i in inner) if g))
+            if not value:
+                continue
+        found[field].append({
+            'value': value,
+            'start': match.start(),
+            'end': match.end(),
+            'variant': variant,
+        })
+    return found
+
+def extract_fields(text, found=None):
+    """Single-pass replacement for the per-field searches.
+
+    Returns the first match in the text for every field, except the phone:
+    like the old per-pattern search, the earliest match of the first
+    PHONE_PATTERNS entry found anywhere wins. Pass `found` to reuse an
+    earlier scan() of the same text.
+    """
+    if found is None:
+        found = scan(text)
+    fields = {field: found[field][0]['value'] if found[field] else "" for field in FIELDS}
+    if found['phone']:
+        best = min(found['phone'], key=lambda match: (match['variant'], match['start']))
+        fields['phone'] = _first_phone(text, found, best['variant']) or best['value']
+    return fields
+
+def _first_phone(text, found, last_variant):
+    """What the old per-pattern search finds, trying variants up to last_variant.
+
+    Scanner matches never overlap, so a variant can also match inside text
+    another branch consumed (e.g. '300-1234567' in '0300-1234567'). Such a
+    match can only start within a scanner match, so only those spans are tried.
+    """
+    spans = sorted((match['start'], match['end']) for matches in found.values() for match in matches)
+    for regex in PHONE_REGEXES[:last_variant + 1]:
+        for start, end in spans:
+            for position in range(start, end):
+                match = regex.match(text, position)
+                if match:
+                    phone = normalize_phone(''.join(g for g in match.groups() if g))
+                    if phone:
+                        return phone
+    return ""
+
+# Words that, shortly before a match, suggest it is the page's own contact
+CONTEXT_KEYWORDS = re.compile(
+    r'(?i)\b(?:e-?mail|contact|call|phone|tel|mobile|whatsapp|website|web|site|visit|'
+    r'orders?|sales|info|support|booking|reservations?)\b'
+)
+CONTEXT_WINDOW = 40
+MIN_TOKEN_LENGTH = 4
+
+# Hosts that are never a business's own website
+IGNORED_HOSTS = ('facebook.com', 'fb.com', 'fbcdn.net', 'instagram.com', 'messenger.com')
+
+DOMAIN_PATTERN = re.compile(r'(?:https?://)?(?:www\.)?([^/\s:?#]+)', re.IGNORECASE)
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+def _domain(kind, value):
+    if kind == 'email':
+        return value.rsplit('@', 1)[-1].lower()
+    if kind == 'website':
+        match = DOMAIN_PATTERN.match(value)
+        return match.group(1).lower() if match else ''
+    return ''
+
+def rank_contacts(text, page_name='', found=None):
+    """Return every email, phone and website candidate with a confidence score.
+
+    Candidates are deduplicated per value and scored from 0 to 1 on how
+    often they occur, whether a contact keyword precedes them and whether
+    their domain matches the page (its name or another candidate's domain).
+    Each kind is sorted best first. Pass `found` to reuse an earlier scan()
+    of the same text.
+    """
+    if found is None:
+        found = scan(text)
+    candidates = {}
+    for kind in ('email', 'phone', 'website'):
+        for match in found[kind]:
+            key = (kind, match['value'].lower() if kind != 'phone' else match['value'])
+            candidate = candidates.setdefault(key, {
+                'kind': kind, 'value': match['value'], 'occurrences': 0, 'context': False
+            })
+            candidate['occurrences'] += 1
+            before = text[max(0, match['start'] - CONTEXT_WINDOW):match['start']]
+            if CONTEXT_KEYWORDS.search(before):
+                candidate['context'] = True
+
+    name_tokens = {t for t in TOKEN_PATTERN.findall(page_name.lower()) if len(t) >= MIN_TOKEN_LENGTH}
+    domains = {}
+    for candidate in candidates.values():
+        domain = _domain(candidate['kind'], candidate['value'])
+        candidate['domain'] = domain
+        if domain:
+            domains[domain] = domains.get(domain, 0) + 1
+
+    ranked = {'email': [], 'phone': [], 'website': []}
+    for candidate in candidates.values():
+        domain = candidate.pop('domain')
+        score = 0.3 + 0.1 * min(candidate['occurrences'] - 1, 3)
+        if candidate.pop('context'):
+            score += 0.25
+        if domain:
+            if domain.endswith(IGNORED_HOSTS):
+                score -= 0.3
+            elif domains[domain] > 1 or any(token in domain for token in name_tokens):
+                score += 0.25
+        candidate['score'] = round(max(0.0, min(score, 1.0)), 2)
+        ranked[candidate['kind']].append(candidate)
+
+    for kind in ranked:
+        ranked[kind].sort(key=lambda c: c['score'], reverse=True)
+    return ranked
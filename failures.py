@@ -0,0 +1,137 @@
+# failures.py
+import os
+import socket
+import random
+
+import requests
+import urllib3
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+# Why a page could not be scraped
+TIMEOUT = 'timeout'
+DRIVER_CRASH = 'driver_crash'
+BLOCKED = 'blocked'
+NOT_FOUND = 'not_found'
+PARSE_MISS = 'parse_miss'
+ERROR = 'error'
+
+KINDS = (TIMEOUT, DRIVER_CRASH, BLOCKED, NOT_FOUND, PARSE_MISS, ERROR)
+
+# Kinds worth another attempt at the end of a job; the rest fail the same way again
+RETRY_KINDS = tuple(
+    kind for kind in os.environ.get('SCRAPER_RETRY_KINDS', f'{TIMEOUT},{DRIVER_CRASH},{ERROR}').split(',') if kind
+)
+
+# Backoff before retry round n (n >= 1): RETRY_BASE_SECONDS * 2 ** (n - 1), capped, with jitter
+RETRY_BASE_SECONDS = float(os.environ.get('SCRAPER_RETRY_BASE_SECONDS', 30))
+RETRY_MAX_SECONDS = float(os.environ.get('SCRAPER_RETRY_MAX_SECONDS', 600))
+
+# WebDriver error text meaning the browser or chromedriver is gone
+DRIVER_CRASH_MARKERS = (
+    'not reachable', 'disconnected', 'session deleted', 'invalid session id',
+    'no such window', 'target window already closed', 'crashed', 'no browser available',
+)
+
+# Page text shown instead of the page when Facebook wants a login or is rate limiting
+BLOCKED_MARKERS = (
+    'you must log in to continue', 'temporarily blocked',
+    'rate limit exceeded', 'please complete a security check',
+)
+BLOCKED_PATHS = ('login', 'login.php', 'checkpoint')
+
+NOT_FOUND_MARKERS = (
+    "this content isn't available", "this page isn't available",
+    'the link you followed may be broken', 'page not found',
+)
+
+# What a page classify_page() rejected turned out to be
+PAGE_FAILURE_MESSAGES = {
+    BLOCKED: 'Login wall or block page',
+    NOT_FOUND: 'Page is not available',
+    PARSE_MISS: 'Page has no text',
+}
+
+class ScrapeFailure(Exception):
+    """A page that could not be scraped, with the `kind` of failure (see KINDS)"""
+
+    def __init__(self, kind, message=''):
+        super().__init__(kind, message)
+        self.kind = kind
+        self.message = message
+
+    def __str__(self):
+        return f'{self.kind}: {self.message}' if self.message else self.kind
+
+    @property
+    def transient(self):
+        return self.kind in RETRY_KINDS
+
+def classify_exception(error):
+    """Failure kind of an exception raised while fetching a page"""
+    if isinstance(error, ScrapeFailure):
+        return error.kind
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return classify_status(error.response.status_code)
+    if isinstance(error, (requests.Timeout, TimeoutException, TimeoutError, socket.timeout)):
+        return TIMEOUT
+    if isinstance(error, requests.RequestException):
+        return ERROR
+    if isinstance(error, WebDriverException):
+        message = (error.msg or str(error)).lower()
+        if 'timed out' in message or 'timeout' in message:
+            return TIMEOUT
+        if any(marker in message for marker in DRIVER_CRASH_MARKERS):
+            return DRIVER_CRASH
+        return ERROR
+    if isinstance(error, (ConnectionError, urllib3.exceptions.HTTPError)):
+        # Outside requests these come from Selenium losing its chromedriver
+        return DRIVER_CRASH
+    return ERROR
+
+def classify_status(status_code):
+    """Failure kind of an HTTP error status"""
+    if status_code in (404, 410):
+        return NOT_FOUND
+    if status_code in (401, 403, 429):
+        return BLOCKED
+    if status_code in (408, 504):
+        return TIMEOUT
+    return ERROR
+
+def from_exception(error, url=''):
+    """Wrap any exception as a ScrapeFailure, keeping its kind"""
+    if isinstance(error, ScrapeFailure):
+        return error
+    message = f'{type(error).__name__}: {error}'.strip()
+    return ScrapeFailure(classify_exception(error), f'{url} {message}' if url else message)
+
+def from_error(error):
+    """ScrapeFailure for whatever a backend reported: an exception, a message or nothing"""
+    if isinstance(error, BaseException):
+        return from_exception(error)
+    return ScrapeFailure(ERROR, str(error) if error else 'Failed to scrape page')
+
+def classify_page(page):
+    """Failure kind of a fetched page snapshot that is not the page asked for, else None"""
+    # Redirected to the login form or a security checkpoint
+    final_path = page.get('final_url', '').split('://', 1)[-1].partition('/')[2]
+    if final_path.split('?', 1)[0].split('/', 1)[0].lower() in BLOCKED_PATHS:
+        return BLOCKED
+
+    text = f"{page['title']}\n{page['text']}".replace('’', "'").lower()
+    if any(marker in text for marker in BLOCKED_MARKERS):
+        return BLOCKED
+    if any(marker in text for marker in NOT_FOUND_MARKERS):
+        return NOT_FOUND
+    if not page['text'].strip():
+        return PARSE_MISS
+    return None
+
+def retry_delay(attempt, rng=random):
+    """Seconds to wait before retry round `attempt`: exponential backoff with jitter.
+
+    Half the backoff is fixed and the other half random, so retries of many
+    jobs do not line up while each round still waits longer than the last.
+    """
+    backoff = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** max(0, attempt - 1))
+    return backoff / 2 + rng.uniform(0, backoff / 2)
@@ -0,0 +1,402 @@
+# fetchers.py
+import os
+import time
+import random
+import requests
+from urllib.parse import urljoin, urlsplit
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+import driver_pool
+import failures
+from failures import ScrapeFailure
+from metrics import timed, merge_timings
+from extraction import IGNORED_HOSTS
+
+# 'auto' tries the HTTP engine first and escalates to Selenium; 'http' or 'selenium' pins one engine
+FETCH_ENGINE = os.environ.get('SCRAPER_FETCH_ENGINE', 'auto')
+
+# Fields the HTTP engine must fill before its result is accepted without escalating
+REQUIRED_FIELDS = tuple(
+    field for field in os.environ.get('SCRAPER_REQUIRED_FIELDS', 'name,email,phone').split(',') if field
+)
+
+HTTP_TIMEOUT = float(os.environ.get('SCRAPER_HTTP_TIMEOUT', 10))
+HTTP_POOL_SIZE = int(os.environ.get('SCRAPER_HTTP_POOL_SIZE', 32))
+
+# How SeleniumFetcher reads a loaded page: 'elements' makes one WebDriver call per
+# field, 'bundle' runs BUNDLE_SCRIPT and gets everything back in a single call
+SELENIUM_EXTRACT = os.environ.get('SCRAPER_SELENIUM_EXTRACT', 'elements')
+
+# Seconds to wait for <body> once driver.get() returns
+BODY_WAIT_SECONDS = 10
+
+# Most outbound links kept per page
+OUTBOUND_LINK_LIMIT = 100
+
+LOCATION_XPATH = "//div[contains(text(), 'Location') or contains(text(), 'Address')]/following-sibling::div"
+
+# Waits for <body>, then collects the whole page snapshot in the browser and
+# returns it as one JSON object, with the milliseconds spent waiting as
+# 'waited'. Afterwards the tab is sent to about:blank, which saves the extra
+# round trip fetch() would otherwise spend on it.
+# Arguments: ignored hosts, link limit, milliseconds to wait for <body>.
+BUNDLE_SCRIPT = r"""
+var done = arguments[arguments.length - 1];
+var ignoredHosts = arguments[0], linkLimit = arguments[1];
+var started = Date.now(), deadline = started + arguments[2];
+
+function isOutbound(a) {
+    if (a.protocol !== 'http:' && a.protocol !== 'https:') return false;
+    var host = a.hostname.toLowerCase();
+    return !ignoredHosts.some(function (h) { return host === h || host.endsWith('.' + h); });
+}
+
+function ownText(el) {
+    var text = '';
+    for (var node = el.firstChild; node; node = node.nextSibling) {
+        if (node.nodeType === Node.TEXT_NODE) text += node.nodeValue;
+    }
+    return text;
+}
+
+function collect() {
+    var heading = document.querySelector('h1');
+    var bundle = {
+        final_url: location.href,
+        text: document.body.innerText || '',
+        title: (heading && heading.innerText.trim()) || document.title || '',
+        address: '',
+        links: [],
+        meta: {}
+    };
+
+    var divs = document.getElementsByTagName('div');
+    for (var i = 0; i < divs.length && !bundle.address; i++) {
+        var own = ownText(divs[i]);
+        if (own.indexOf('Location') === -1 && own.indexOf('Address') === -1) continue;
+        var sibling = divs[i].nextElementSibling;
+        while (sibling && sibling.tagName !== 'DIV') sibling = sibling.nextElementSibling;
+        if (sibling) bundle.address = sibling.innerText;
+    }
+
+    var seen = {};
+    for (var j = 0; j < document.links.length && bundle.links.length < linkLimit; j++) {
+        var a = document.links[j];
+        if (isOutbound(a) && !seen[a.href]) {
+            seen[a.href] = true;
+            bundle.links.push(a.href);
+        }
+    }
+
+    var metas = document.getElementsByTagName('meta');
+    for (var k = 0; k < metas.length; k++) {
+        var key = metas[k].getAttribute('property') || metas[k].getAttribute('name');
+        var content = metas[k].getAttribute('content');
+        if (key && content && !(key in bundle.meta)) bundle.meta[key] = content;
+    }
+    return bundle;
+}
+
+(function poll() {
+    if (document.body) {
+        var bundle;
+        var waited = Date.now() - started;
+        try {
+            bundle = collect();
+        } catch (e) {
+            bundle = {error: String(e)};
+        }
+        bundle.waited = waited;
+        done(bundle);
+        setTimeout(function () { location.replace('about:blank'); }, 0);
+    } else if (Date.now() > deadline) {
+        done(null);
+    } else {
+        setTimeout(poll, 50);
+    }
+})();
+"""
+
+def new_page(url, engine):
+    """Empty page snapshot: what an engine hands to data extraction"""
+    return {
+        'url': url, 'engine': engine, 'final_url': url, 'text': '', 'title': '', 'address': '',
+        'links': [], 'meta': {}, 'timings': {},
+    }
+
+def is_outbound(href):
+    """Whether an absolute link leaves Facebook (and its CDN and sister sites)"""
+    parts = urlsplit(href)
+    if parts.scheme not in ('http', 'https'):
+        return False
+    host = (parts.hostname or '').lower()
+    return not any(host == ignored or host.endswith('.' + ignored) for ignored in IGNORED_HOSTS)
+
+class Fetcher:
+    """Interface for page fetch engines.
+
+    fetch(url, cancel) returns a page snapshot (see new_page) and raises
+    ScrapeFailure when the page cannot be loaded. The snapshot's 'timings'
+    hold the seconds spent per phase (see metrics.PHASES). `cancel` is an
+    optional token whose `cancelled` flag, once set, asks the engine to give
+    up as soon as it can; fetch() then returns None.
+    """
+
+    name = 'base'
+
+    def fetch(self, url, cancel=None):
+        raise NotImplementedError
+
+class HttpFetcher(Fetcher):
+    """Fetches server-rendered HTML over a pooled, keep-alive requests.Session"""
+
+    name = 'http'
+
+    def __init__(self, timeout=HTTP_TIMEOUT, pool_size=HTTP_POOL_SIZE):
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'User-Agent': random.choice(driver_pool.USER_AGENTS),
+            'Accept': 'text/html,application/xhtml+xml',
+            'Accept-Encoding': 'gzip, deflate',
+            'Accept-Language': 'en-US,en;q=0.9',
+        })
+
+    def fetch(self, url, cancel=None):
+        timings = {}
+        try:
+            with timed(timings, 'navigation'):
+                response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise failures.from_exception(e) from e
+        with timed(timings, 'extraction'):
+            page = parse_html(url, response.text)
+        page['final_url'] = response.url
+        page['timings'] = timings
+        return page
+
+def parse_html(url, html):
+    """Build a page snapshot from static HTML"""
+    page = new_page(url, HttpFetcher.name)
+    soup = BeautifulSoup(html, 'html.parser')
+
+    for tag in soup(['script', 'style', 'noscript', 'template']):
+        tag.decompose()
+
+    title = soup.find('h1') or soup.find('title')
+    if title:
+        page['title'] = title.get_text(' ', strip=True)
+
+    for div in soup.find_all('div'):
+        own_text = ''.join(div.find_all(string=True, recursive=False))
+        if 'Location' in own_text or 'Address' in own_text:
+            sibling = div.find_next_sibling('div')
+            if sibling:
+                page['address'] = sibling.get_text(' ', strip=True)
+                break
+
+    for a in soup.find_all('a', href=True):
+        href = urljoin(url, a['href'])
+        if is_outbound(href) and href not in page['links']:
+            page['links'].append(href)
+            if len(page['links']) >= OUTBOUND_LINK_LIMIT:
+                break
+
+    for meta in soup.find_all('meta'):
+        key = meta.get('property') or meta.get('name')
+        content = meta.get('content')
+        if key and content:
+            page['meta'].setdefault(key, content)
+
+    body = soup.body or soup
+    page['text'] = body.get_text('\n', strip=True)
+    return page
+
+class SeleniumFetcher(Fetcher):
+    """Renders the page in a pooled headless Chrome.
+
+    `extract` picks how the loaded page is read (see SELENIUM_EXTRACT).
+    """
+
+    name = 'selenium'
+
+    def __init__(self, extract=SELENIUM_EXTRACT):
+        self.extract = extract
+
+    def fetch(self, url, cancel=None):
+        acquire_start = time.perf_counter()
+        failure = None
+        with driver_pool.get_pool().driver(cancel=cancel) as driver:
+            if not driver:
+                if cancel is not None and cancel.cancelled:
+                    return None
+                raise ScrapeFailure(failures.DRIVER_CRASH, 'No browser available')
+            acquired = time.perf_counter() - acquire_start
+            page = None
+            try:
+                page = self.snapshot(driver, url, cancel)
+            except ScrapeFailure as e:
+                # A crashed driver propagates so the pool discards it; others are reused
+                if e.kind == failures.DRIVER_CRASH:
+                    raise
+                failure = e
+            
+            # A successful bundle has already sent the tab to about:blank
+            if page is None or self.extract != 'bundle':
+                try:
+                    driver.get("about:blank")
+                except Exception as e:
+                    raise ScrapeFailure(failures.DRIVER_CRASH, f'Resetting the browser failed: {e}') from e
+        
+        if failure is not None:
+            raise failure
+        if page is not None:
+            page['timings']['driver_acquire'] = acquired
+        return page
+
+    def snapshot(self, driver, url, cancel=None):
+        """Load url in an already checked-out driver and read the page.
+
+        Returns None if `cancel` is set, and raises ScrapeFailure if the page
+        cannot be loaded or read.
+        """
+        if self.extract == 'bundle':
+            return self.snapshot_bundle(driver, url, cancel)
+        return self.snapshot_elements(driver, url, cancel)
+
+    def snapshot_bundle(self, driver, url, cancel=None):
+        """Read the page with a single BUNDLE_SCRIPT call after navigating"""
+        page = new_page(url, self.name)
+        timings = page['timings']
+        try:
+            with timed(timings, 'navigation'):
+                driver.get(url)
+            if cancel is not None and cancel.cancelled:
+                return None
+
+            with timed(timings, 'extraction'):
+                bundle = driver.execute_async_script(
+                    BUNDLE_SCRIPT, list(IGNORED_HOSTS), OUTBOUND_LINK_LIMIT, BODY_WAIT_SECONDS * 1000
+                )
+            if not bundle:
+                raise ScrapeFailure(failures.TIMEOUT, 'Page has no body')
+            if bundle.get('error'):
+                raise ScrapeFailure(failures.PARSE_MISS, bundle['error'])
+
+            for key in ('final_url', 'text', 'title', 'address', 'links', 'meta'):
+                if bundle.get(key):
+                    page[key] = bundle[key]
+
+            # The script reports how long it waited for <body>; the rest was extraction
+            waited = min(bundle.get('waited', 0) / 1000, timings['extraction'])
+            timings['readiness_wait'] = waited
+            timings['extraction'] -= waited
+            return page
+
+        except ScrapeFailure:
+            raise
+        except Exception as e:
+            raise failures.from_exception(e) from e
+
+    def snapshot_elements(self, driver, url, cancel=None):
+        """Read the page with one WebDriver call per field"""
+        page = new_page(url, self.name)
+        timings = page['timings']
+        body_present = EC.presence_of_element_located((By.TAG_NAME, "body"))
+        try:
+            # driver.get() is bounded by the driver's page-load timeout
+            with timed(timings, 'navigation'):
+                driver.get(url)
+            with timed(timings, 'readiness_wait'):
+                WebDriverWait(driver, BODY_WAIT_SECONDS).until(
+                    lambda d: (cancel is not None and cancel.cancelled) or body_present(d)
+                )
+            if cancel is not None and cancel.cancelled:
+                return None
+
+            extract_start = time.perf_counter()
+            page['final_url'] = driver.current_url
+            page['text'] = driver.find_element(By.TAG_NAME, 'body').text
+
+            try:
+                page['title'] = driver.find_element(By.XPATH, "//h1 | //title").text
+            except Exception:
+                pass
+
+            try:
+                location_elem = driver.find_elements(By.XPATH, LOCATION_XPATH)
+                if location_elem:
+                    page['address'] = location_elem[0].text
+            except Exception:
+                pass
+
+            timings['extraction'] = time.perf_counter() - extract_start
+            return page
+
+        except Exception as e:
+            raise failures.from_exception(e) from e
+
+_http_fetcher = None
+
+def get_fetchers(engine=FETCH_ENGINE):
+    """Fetch engines to try in order, cheapest first"""
+    global _http_fetcher
+    if engine == 'selenium':
+        return [SeleniumFetcher()]
+    if _http_fetcher is None:
+        _http_fetcher = HttpFetcher()
+    if engine == 'http':
+        return [_http_fetcher]
+    return [_http_fetcher, SeleniumFetcher()]
+
+def has_required_fields(data, required=REQUIRED_FIELDS):
+    """Whether extracted data is complete enough to skip escalation"""
+    return all(data.get(field) for field in required)
+
+def fetch_and_extract(url, extract, engine=FETCH_ENGINE, cancel=None):
+    """Run each engine until one yields data with the required fields.
+
+    `extract(url, page)` turns a page snapshot into a data dict. The last
+    engine's result is returned even if it is incomplete, with the seconds
+    spent per phase by every engine tried in 'phase_timings'. A page that
+    loads but is a login wall, a missing page or empty counts as a failure
+    of that engine. If no engine yields data the last ScrapeFailure is
+    raised, unless `cancel` was set, in which case None is returned and no
+    further engine is tried.
+    """
+    data = None
+    failure = None
+    timings = {}
+    for fetcher in get_fetchers(engine):
+        if cancel is not None and cancel.cancelled:
+            break
+        try:
+            page = fetcher.fetch(url, cancel)
+            if page is None:
+                continue
+            kind = failures.classify_page(page)
+            if kind:
+                message = failures.PAGE_FAILURE_MESSAGES[kind]
+                raise ScrapeFailure(kind, f"{message} ({fetcher.name} engine, {page['final_url']})")
+        except ScrapeFailure as e:
+            print(f"{fetcher.name} fetch failed for {url}: {e}")
+            failure = e
+            continue
+        merge_timings(timings, page['timings'])
+        with timed(timings, 'extraction'):
+            data = extract(url, page)
+        if has_required_fields(data):
+            break
+    if data is not None:
+        data['phase_timings'] = {phase: round(seconds, 4) for phase, seconds in timings.items()}
+    elif failure is not None and not (cancel is not None and cancel.cancelled):
+        raise failure
+    return data
@@ -0,0 +1,166 @@
+# metrics.py
+import os
+import time
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Phases a page goes through, in order
+PHASES = (
+    'queue_wait',
+    'driver_acquire',
+    'navigation',
+    'readiness_wait',
+    'extraction',
+    'db_write',
+    'socket_emit',
+)
+
+# Histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Per-job series are kept for this many of the most recent jobs
+METRICS_JOB_SERIES = int(os.environ.get('SCRAPER_METRICS_JOBS', 20))
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+@contextmanager
+def timed(timings, phase):
+    """Add the time spent in the block to timings[phase]"""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[phase] = timings.get(phase, 0.0) + time.perf_counter() - start_time
+
+def merge_timings(total, timings):
+    """Add every phase of `timings` into `total`"""
+    for phase, seconds in timings.items():
+        total[phase] = total.get(phase, 0.0) + seconds
+    return total
+
+class Histogram:
+    """Counts of observations per bucket, plus their sum"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """(le, count) pairs as Prometheus reports them, ending with +Inf"""
+        running = 0
+        pairs = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            running += count
+            pairs.append(('+Inf' if bound == float('inf') else f'{bound:g}', running))
+        return pairs
+
+def _labels(**labels):
+    return ','.join(f'{key}="{value}"' for key, value in labels.items())
+
+class MetricsRegistry:
+    """Phase latency histograms and page counters, globally and per job.
+
+    observe() records one phase of one page; count() records a finished
+    page by outcome. render() returns everything in the Prometheus text
+    exposition format. Only the `max_jobs` most recently seen jobs keep
+    per-job series, so a long-running server does not grow without bound.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS, max_jobs=METRICS_JOB_SERIES):
+        self.buckets = buckets
+        self.max_jobs = max_jobs
+        self._phases = {}
+        self._pages = {}
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _job(self, job_id):
+        # Called with the lock held
+        series = self._jobs.get(job_id)
+        if series is None:
+            series = self._jobs[job_id] = {'phases': {}, 'pages': {}}
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+        else:
+            self._jobs.move_to_end(job_id)
+        return series
+
+    def observe(self, phase, seconds, job_id=None):
+        """Record time spent in one phase of one page"""
+        with self._lock:
+            targets = [self._phases]
+            if job_id is not None:
+                targets.append(self._job(job_id)['phases'])
+            for histograms in targets:
+                histogram = histograms.get(phase)
+                if histogram is None:
+                    histogram = histograms[phase] = Histogram(self.buckets)
+                histogram.observe(seconds)
+
+    def observe_timings(self, timings, job_id=None):
+        """Record every phase of a page's {phase: seconds} timings"""
+        for phase, seconds in timings.items():
+            self.observe(phase, seconds, job_id)
+
+    def count(self, outcome, job_id=None, amount=1):
+        """Record finished pages by outcome ('success', 'failed', ...)"""
+        with self._lock:
+            self._pages[outcome] = self._pages.get(outcome, 0) + amount
+            if job_id is not None:
+                pages = self._job(job_id)['pages']
+                pages[outcome] = pages.get(outcome, 0) + amount
+
+    def render(self):
+        """Every metric in the Prometheus text format"""
+        with self._lock:
+            phases = [((), phase, histogram) for phase, histogram in self._phases.items()]
+            pages = [((), outcome, value) for outcome, value in self._pages.items()]
+            job_phases = []
+            job_pages = []
+            for job_id, series in self._jobs.items():
+                job = (('job', job_id),)
+                job_phases += [(job, phase, histogram) for phase, histogram in series['phases'].items()]
+                job_pages += [(job, outcome, value) for outcome, value in series['pages'].items()]
+
+            lines = []
+            for name, help_text, rows in (
+                ('scraper_phase_seconds', 'Time spent in each phase of scraping a page.', phases),
+                ('scraper_job_phase_seconds', 'Time spent in each phase of scraping a page, per job.', job_phases),
+            ):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for extra, phase, histogram in sorted(rows, key=_phase_order):
+                    labels = _labels(**dict(extra), phase=phase)
+                    for le, count in histogram.cumulative():
+                        lines.append(f'{name}_bucket{{{labels},le="{le}"}} {count}')
+                    lines.append(f'{name}_sum{{{labels}}} {histogram.sum:.6f}')
+                    lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+            for name, help_text, rows in (
+                ('scraper_pages_total', 'Pages finished, by outcome.', pages),
+                ('scraper_job_pages_total', 'Pages finished, by outcome, per job.', job_pages),
+            ):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} counter')
+                for extra, outcome, value in sorted(rows, key=lambda row: (row[0], row[1])):
+                    lines.append(f'{name}{{{_labels(**dict(extra), outcome=outcome)}}} {value}')
+        return '\n'.join(lines) + '\n'
+
+def _phase_order(row):
+    extra, phase, _ = row
+    return extra, PHASES.index(phase) if phase in PHASES else len(PHASES), phase
+
+registry = MetricsRegistry()
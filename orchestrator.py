@@ -0,0 +1,101 @@
+# orchestrator.py
+import asyncio
+import threading
+
+# How often a cancellable stream checks its token while pages are in flight
+CANCEL_POLL_SECONDS = 0.25
+
+# An item meaning "nothing to run yet": the stream stops pulling until running work completes
+IDLE = object()
+
+class Cancelled(Exception):
+    """Raised by work that notices its job was cancelled before it finished"""
+
+class CancellationToken:
+    """Thread-safe flag that a stopping job sets and its workers poll"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise Cancelled()
+
+    def wait(self, timeout=None):
+        """Sleep up to timeout seconds, returning early (True) if cancelled"""
+        return self._event.wait(timeout)
+
+async def _stream(items, work, window, executor, cancel=None):
+    """Async generator behind stream(); see there"""
+    loop = asyncio.get_running_loop()
+    items = iter(items)
+    in_flight = {}
+    exhausted = False
+    timeout = None if cancel is None else CANCEL_POLL_SECONDS
+
+    try:
+        while True:
+            if cancel is not None and cancel.cancelled:
+                # Stop pulling and give up on queued work; running work finishes in its thread
+                for future, item in list(in_flight.items()):
+                    future.cancel()
+                    yield item, None, Cancelled()
+                in_flight.clear()
+                return
+
+            while not exhausted and len(in_flight) < max(1, window()):
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                if item is IDLE:
+                    break
+                in_flight[loop.run_in_executor(executor, work, item)] = item
+
+            if not in_flight:
+                if exhausted:
+                    return
+                continue
+
+            done, _ = await asyncio.wait(in_flight, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                item = in_flight.pop(future)
+                error = future.exception()
+                yield item, (None if error else future.result()), error
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+def stream(items, work, window, executor, cancel=None):
+    """Run work(item) on executor with a bounded number in flight.
+
+    Items are pulled lazily from the iterable only when a slot frees up, and
+    (item, result, error) tuples are yielded as work completes, so memory
+    stays constant however long the input is. `window` is a callable
+    returning the current in-flight limit, letting it change while running.
+    An item may be IDLE, which pauses pulling until a running item finishes;
+    a source should only send it while something is in flight.
+
+    Once the optional CancellationToken `cancel` is set no more items are
+    pulled and every unfinished item is yielded at once with a Cancelled
+    error; work not yet started in the executor is cancelled with it.
+    """
+    loop = asyncio.new_event_loop()
+    agen = _stream(items, work, window, executor, cancel)
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(agen.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(agen.aclose())
+        loop.close()
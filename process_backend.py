@@ -0,0 +1,149 @@
+# process_backend.py
+import os
+import multiprocessing
+from multiprocessing.connection import wait
+
+from failures import ScrapeFailure
+from orchestrator import IDLE
+
+DEFAULT_PROCESSES = os.cpu_count() or 1
+
+def _worker_loop(target, conn):
+    """Run target(item) for each item received until a None sentinel arrives"""
+    try:
+        while True:
+            item = conn.recv()
+            if item is None:
+                break
+            try:
+                conn.send((target(item), None))
+            except ScrapeFailure as e:
+                # Sent whole so the parent keeps the kind of failure
+                conn.send((None, e))
+            except Exception as e:
+                conn.send((None, f"{type(e).__name__}: {e}"))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        # Each process owns its browsers; quit them before exiting
+        import driver_pool
+        driver_pool.shutdown_pool()
+
+class _Worker:
+    """A worker process plus the pipe used to hand it one item at a time"""
+
+    def __init__(self, context, target):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_loop, args=(target, child_conn),
+            name='scrape-worker', daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.item = None
+        self.busy = False
+
+    def submit(self, item):
+        self.item = item
+        self.busy = True
+        self.conn.send(item)
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+
+class ProcessScrapeBackend:
+    """Runs a scrape function in a pool of worker processes.
+
+    Each worker process imports the target's module, so it gets its own
+    interpreter, GIL and driver pool. Items are handed out one per idle
+    worker and results are streamed back as they complete, so regex and HTML
+    parsing never compete with the Flask/SocketIO process for the GIL. A
+    worker that dies is replaced and its item reported as failed.
+
+    `target` must be a module-level function taking one item.
+    """
+
+    def __init__(self, target, processes=DEFAULT_PROCESSES):
+        self.target = target
+        self.processes = max(1, processes)
+        self._context = multiprocessing.get_context('spawn')
+        self._workers = []
+
+    def start(self):
+        """Start the worker processes"""
+        self._workers = [_Worker(self._context, self.target) for _ in range(self.processes)]
+        return self
+
+    def imap_unordered(self, items, window=None):
+        """Yield (item, result, error) for each item as workers finish them.
+
+        Items are pulled from the iterable only when a worker is idle, so
+        long inputs are never copied into the workers up front. `window` is
+        an optional callable capping how many items are in flight; an IDLE
+        item pauses pulling until a worker finishes (see orchestrator.stream).
+        """
+        items = iter(items)
+        exhausted = False
+
+        while True:
+            limit = len(self._workers) if window is None else max(1, window())
+            busy = sum(1 for worker in self._workers if worker.busy)
+            for worker in self._workers:
+                if exhausted or busy >= limit:
+                    break
+                if worker.busy:
+                    continue
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                if item is IDLE:
+                    break
+                worker.submit(item)
+                busy += 1
+
+            busy = [worker for worker in self._workers if worker.busy]
+            if not busy:
+                if exhausted:
+                    return
+                continue
+
+            handles = {}
+            for worker in busy:
+                handles[worker.conn] = worker
+                handles[worker.process.sentinel] = worker
+            for handle in wait(list(handles)):
+                worker = handles[handle]
+                if not worker.busy:
+                    continue
+                worker.busy = False
+                try:
+                    result, error = worker.conn.recv()
+                except (EOFError, OSError):
+                    result, error = None, 'Worker process exited'
+                    self._replace(worker)
+                yield worker.item, result, error
+
+    def _replace(self, worker):
+        worker.process.join(timeout=1)
+        index = self._workers.index(worker)
+        self._workers[index] = _Worker(self._context, self.target)
+
+    def close(self):
+        """Stop the workers after they finish their current item"""
+        for worker in self._workers:
+            worker.stop()
+        for worker in self._workers:
+            worker.process.join()
+            worker.conn.close()
+        self._workers = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
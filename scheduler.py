@@ -0,0 +1,220 @@
+# scheduler.py
+import threading
+
+from orchestrator import IDLE
+
+class ScheduledJob:
+    """A job's URLs plus its share of the worker pool.
+
+    Higher `priority` jobs are always served first; jobs of equal priority
+    split the pool in proportion to `weight`. `max_in_flight` caps how many
+    of the job's items run at once (None for no cap beyond the lane's).
+    """
+
+    def __init__(self, job_id, items, priority=0, weight=1.0, max_in_flight=None):
+        self.job_id = job_id
+        self.items = iter(items)
+        self.priority = priority
+        self.weight = weight if weight > 0 else 1.0
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.dispatched = 0
+        # Dispatches scaled by weight, counted from when the job joined its lane
+        self.virtual_time = 0.0
+        self.exhausted = False
+        self.stopped = False
+        # The exception that ended the job if reading its items failed
+        self.error = None
+
+    def has_room(self):
+        """Whether the job may dispatch another item now"""
+        return not self.exhausted and (self.max_in_flight is None or self.in_flight < self.max_in_flight)
+
+    def open_slots(self, capacity):
+        if self.exhausted:
+            return 0
+        limit = capacity if self.max_in_flight is None else min(capacity, self.max_in_flight)
+        return max(0, limit - self.in_flight)
+
+class Lane:
+    """Runs every job of one backend through a single shared worker pool.
+
+    `run(items, window)` must stream (item, result, error) for items pulled
+    lazily from `items` with at most window() in flight; orchestrator.stream
+    and ProcessScrapeBackend.imap_unordered both fit. Items are (job_id,
+    item) pairs chosen when a slot frees up: from the highest-priority job
+    with room, and among equals from the one with the lowest virtual time
+    (dispatches divided by weight). A job joins at the lowest virtual time
+    on the lane, so a late job shares slots rather than catching up on
+    everything its peers dispatched before it. `capacity` is a callable
+    giving the lane's current concurrency.
+
+    One run() stream lives as long as the lane, so a backend's workers are
+    started once. While no job has room the item source sends IDLE if items
+    are still running, and otherwise blocks until a job is submitted or
+    shutdown() is called.
+    """
+
+    def __init__(self, name, run, capacity, on_result, on_job_done):
+        self.name = name
+        self.run = run
+        self.capacity = capacity
+        self.on_result = on_result
+        self.on_job_done = on_job_done
+        self._jobs = {}
+        self._cond = threading.Condition()
+        self._thread = None
+        self._shutdown = False
+
+    def submit(self, job):
+        """Add a job; its items start flowing at the next free slot"""
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError(f'Lane {self.name} is shut down')
+            peers = [other.virtual_time for other in self._jobs.values() if not other.exhausted]
+            job.virtual_time = min(peers, default=0.0)
+            self._jobs[job.job_id] = job
+            self._cond.notify_all()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._loop, name=f'scheduler-{self.name}', daemon=True
+                )
+                self._thread.start()
+
+    def stop(self, job_id):
+        """Dispatch nothing more for a job; items already running still finish"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return False
+            job.exhausted = True
+            job.stopped = True
+            finished = self._pop_if_done(job)
+        if finished:
+            self.on_job_done(job)
+        return True
+
+    def shutdown(self, wait=True):
+        """End the lane's stream once running items finish; queued items are not started"""
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+            thread = self._thread
+        if wait and thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def jobs(self):
+        with self._cond:
+            return list(self._jobs.values())
+
+    def _pop_if_done(self, job):
+        # Called with the lock held; exactly one caller gets to finish a job
+        if job.exhausted and not job.in_flight and self._jobs.get(job.job_id) is job:
+            del self._jobs[job.job_id]
+            return True
+        return False
+
+    def _pick(self):
+        eligible = [job for job in self._jobs.values() if job.has_room()]
+        if not eligible:
+            return None
+        return min(eligible, key=lambda job: (-job.priority, job.virtual_time, job.job_id))
+
+    def _items(self):
+        while True:
+            finished = None
+            with self._cond:
+                job = self._pick()
+                while job is None and not self._shutdown:
+                    if any(other.in_flight for other in self._jobs.values()):
+                        # Blocking here would hold up the results that free a slot
+                        break
+                    self._cond.wait()
+                    job = self._pick()
+                if self._shutdown:
+                    return
+                if job is None:
+                    idle = True
+                else:
+                    idle = False
+                    try:
+                        item = next(job.items)
+                    except StopIteration:
+                        job.exhausted = True
+                        if self._pop_if_done(job):
+                            finished = job
+                    except Exception as e:
+                        # e.g. leasing its URLs failed; only this job ends, the lane goes on
+                        print(f"Error reading items of job {job.job_id}: {e}")
+                        job.exhausted = True
+                        job.error = e
+                        if self._pop_if_done(job):
+                            finished = job
+                    else:
+                        job.in_flight += 1
+                        job.dispatched += 1
+                        job.virtual_time += 1 / job.weight
+            if idle:
+                yield IDLE
+            elif finished is not None:
+                self.on_job_done(finished)
+            elif not job.exhausted:
+                yield job.job_id, item
+
+    def _window(self):
+        # Only ask for another item when some job could actually supply one
+        capacity = max(1, self.capacity())
+        with self._cond:
+            in_flight = sum(job.in_flight for job in self._jobs.values())
+            open_slots = sum(job.open_slots(capacity) for job in self._jobs.values())
+        return min(capacity, in_flight + open_slots)
+
+    def _loop(self):
+        # Returns only after shutdown(), when _items() ends the stream
+        for (job_id, item), result, error in self.run(self._items(), self._window):
+            with self._cond:
+                job = self._jobs[job_id]
+                job.in_flight -= 1
+                finished = self._pop_if_done(job)
+            try:
+                self.on_result(job_id, item, result, error)
+            except Exception as e:
+                print(f"Error handling result for job {job_id}: {e}")
+            if finished:
+                self.on_job_done(job)
+
+class JobScheduler:
+    """Accepts any number of jobs and runs them concurrently on shared lanes"""
+
+    def __init__(self, on_result, on_job_done):
+        self.on_result = on_result
+        self.on_job_done = on_job_done
+        self._lanes = {}
+        self._lock = threading.Lock()
+
+    def add_lane(self, name, run, capacity):
+        """Register a backend; see Lane for what `run` and `capacity` must be"""
+        with self._lock:
+            self._lanes[name] = Lane(name, run, capacity, self.on_result, self._finish)
+
+    def submit(self, job, lane):
+        """Queue a ScheduledJob on the named lane"""
+        self._lanes[lane].submit(job)
+
+    def stop(self, job_id):
+        """Stop dispatching a job's items; returns False if it is not scheduled"""
+        return any(lane.stop(job_id) for lane in list(self._lanes.values()))
+
+    def shutdown(self):
+        """Shut every lane down, waiting for running items to finish"""
+        for lane in list(self._lanes.values()):
+            lane.shutdown()
+
+    def active_jobs(self):
+        return [job for lane in list(self._lanes.values()) for job in lane.jobs()]
+
+    def _finish(self, job):
+        try:
+            self.on_job_done(job)
+        except Exception as e:
+            print(f"Error finishing job {job.job_id}: {e}")
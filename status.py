@@ -0,0 +1,114 @@
+# status.py
+import os
+import time
+import threading
+
+# Socket broadcasts per second, and seconds between database writes of job counters
+STATUS_SOCKET_HZ = float(os.environ.get('STATUS_SOCKET_HZ', 4))
+STATUS_DB_INTERVAL = float(os.environ.get('STATUS_DB_INTERVAL', 3))
+
+# Distinguishes a key missing from the last broadcast from one sent as None
+_MISSING = object()
+
+class StatusAggregator:
+    """Coalesces job status changes into fixed-rate broadcasts and writes.
+
+    Jobs register their status dict with track(); callers then change it
+    through update() (or directly) without any I/O. A ticker thread calls
+    emit(job_id, diff) socket_hz times a second with only the keys that
+    changed since the last broadcast (plus 'id'), and every db_interval
+    seconds calls persist(job_id, status) for jobs whose `persisted_keys`
+    changed. flush() pushes a job out at once, e.g. when it finishes.
+    """
+
+    def __init__(self, emit, persist, persisted_keys, socket_hz=STATUS_SOCKET_HZ,
+                 db_interval=STATUS_DB_INTERVAL):
+        self.emit = emit
+        self.persist = persist
+        self.persisted_keys = tuple(persisted_keys)
+        self.tick_interval = 1.0 / socket_hz
+        self.db_interval = db_interval
+        self._statuses = {}
+        self._sent = {}
+        self._saved = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def track(self, job_id, status):
+        """Start aggregating a job's status dict; the next tick sends it in full"""
+        with self._lock:
+            self._statuses[job_id] = status
+            self._sent[job_id] = {}
+            self._saved.setdefault(job_id, None)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='status-aggregator', daemon=True)
+                self._thread.start()
+
+    def untrack(self, job_id):
+        """Stop aggregating a job after flushing it"""
+        self.flush(job_id)
+        with self._lock:
+            self._statuses.pop(job_id, None)
+            self._sent.pop(job_id, None)
+            self._saved.pop(job_id, None)
+
+    def update(self, job_id, changes):
+        """Apply changes to a tracked job's status; they go out on the next tick"""
+        with self._lock:
+            status = self._statuses.get(job_id)
+            if status is not None:
+                status.update(changes)
+
+    def flush(self, job_id):
+        """Broadcast and persist a job's pending changes now"""
+        self._emit(job_id)
+        self._persist(job_id)
+
+    def _diff(self, job_id):
+        with self._lock:
+            status = self._statuses.get(job_id)
+            if status is None:
+                return None
+            snapshot = dict(status)
+            sent = self._sent[job_id]
+            diff = {key: value for key, value in snapshot.items() if sent.get(key, _MISSING) != value}
+            self._sent[job_id] = snapshot
+        if diff:
+            diff['id'] = job_id
+        return diff
+
+    def _emit(self, job_id):
+        diff = self._diff(job_id)
+        if diff:
+            try:
+                self.emit(job_id, diff)
+            except Exception as e:
+                print(f"Error emitting status for job {job_id}: {e}")
+
+    def _persist(self, job_id):
+        with self._lock:
+            status = self._statuses.get(job_id)
+            if status is None:
+                return
+            values = tuple(status.get(key) for key in self.persisted_keys)
+            if values == self._saved.get(job_id):
+                return
+            self._saved[job_id] = values
+            snapshot = dict(status)
+        try:
+            self.persist(job_id, snapshot)
+        except Exception as e:
+            print(f"Error saving status for job {job_id}: {e}")
+
+    def _run(self):
+        ticks_per_write = max(1, round(self.db_interval / self.tick_interval))
+        tick = 0
+        while True:
+            time.sleep(self.tick_interval)
+            tick += 1
+            with self._lock:
+                job_ids = list(self._statuses)
+            for job_id in job_ids:
+                self._emit(job_id)
+                if tick % ticks_per_write == 0:
+                    self._persist(job_id)
@@ -0,0 +1,26 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# database (and the apps) create their files in the working directory on import,
+# so keep them away from the ones checked in at the repo root
+os.chdir(tempfile.mkdtemp(prefix='fb-tests-'))
+
+@pytest.fixture
+def db(tmp_path):
+    """The database module on a fresh file of its own"""
+    import database
+
+    database.get_writer().close()
+    database._pool.close_all()
+    database.DB_NAME = str(tmp_path / 'test.db')
+    database.init_database()
+    yield database
+    database.get_writer().close()
+    database._pool.close_all()
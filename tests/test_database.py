@@ -0,0 +1,69 @@
+# tests/test_database.py
+import time
+
+def test_lease_hands_out_each_pending_url_once(db):
+    job_id = db.create_job('lease', 5)
+    db.add_job_urls(job_id, [f'https://www.facebook.com/page{i}' for i in range(5)])
+
+    first = db.lease_job_urls(job_id, 3)
+    second = db.lease_job_urls(job_id, 3)
+
+    assert first == [f'https://www.facebook.com/page{i}' for i in range(3)]
+    assert second == ['https://www.facebook.com/page3', 'https://www.facebook.com/page4']
+    assert db.lease_job_urls(job_id, 3) == []
+    assert db.get_job_url_counts(job_id)['in_progress'] == 5
+
+def test_iter_job_urls_leases_as_it_goes(db):
+    job_id = db.create_job('iter', 4)
+    db.add_job_urls(job_id, [f'https://www.facebook.com/page{i}' for i in range(4)])
+
+    urls = db.iter_job_urls(job_id, lease_size=2)
+    assert next(urls) == 'https://www.facebook.com/page0'
+    assert db.get_job_url_counts(job_id) == {'pending': 2, 'in_progress': 2, 'done': 0, 'failed': 0}
+    assert list(urls) == [f'https://www.facebook.com/page{i}' for i in range(1, 4)]
+
+def test_requeue_only_retries_transient_failures_under_the_attempt_limit(db):
+    job_id = db.create_job('retry', 3)
+    links = ['https://www.facebook.com/slow', 'https://www.facebook.com/gone', 'https://www.facebook.com/flaky']
+    db.add_job_urls(job_id, links)
+    assert db.lease_job_urls(job_id, 3) == links
+    for link, kind in zip(links, ('timeout', 'not_found', 'error')):
+        db.queue_scraped_data(job_id, {'page_link': link, 'status': 'failed', 'failure_kind': kind})
+    db.flush_scraped_data()
+
+    assert db.requeue_failed_job_urls(job_id, ('timeout', 'error'), max_attempts=3) == (2, 1)
+    assert db.get_job_failure_counts(job_id) == {'not_found': 1}
+    assert db.get_job_url_counts(job_id) == {'pending': 2, 'in_progress': 0, 'done': 0, 'failed': 1}
+
+def test_flush_waits_for_rows_queued_before_it(db):
+    # Without the marker the row would sit in the batch until the minute-long window closes
+    writer = db.ScrapedDataWriter(batch_size=100, flush_ms=60000)
+    job_id = db.create_job('flush', 1)
+    writer.put(job_id, {'page_link': 'https://www.facebook.com/queued', 'status': 'success'})
+
+    started = time.monotonic()
+    assert writer.flush(timeout=5)
+    assert time.monotonic() - started < 5
+    assert [row['page_link'] for row in db.get_scraped_data(job_id)] == ['https://www.facebook.com/queued']
+    assert writer.rows_written == 1
+    writer.close()
+
+def test_keyset_pages_cover_rows_that_share_a_timestamp(db):
+    job_id = db.create_job('pages', 7)
+    for i in range(7):
+        db.queue_scraped_data(job_id, {'page_link': f'https://www.facebook.com/page{i}', 'status': 'success'})
+    db.flush_scraped_data()
+    with db.get_connection() as conn:
+        conn.execute("UPDATE scraped_data SET scraped_at = '2026-01-01 00:00:00'")
+        conn.execute("UPDATE scraped_data SET scraped_at = '2026-01-02 00:00:00' WHERE page_link LIKE '%page6'")
+        conn.commit()
+
+    seen, cursor = [], None
+    while True:
+        rows, cursor = db.get_scraped_data_page(job_id, limit=3, after=cursor)
+        seen.extend(row['page_link'] for row in rows)
+        if cursor is None:
+            break
+
+    # Newest first, then by id within the tie, with every row exactly once
+    assert seen == [f'https://www.facebook.com/page{i}' for i in (6, 5, 4, 3, 2, 1, 0)]
@@ -0,0 +1,59 @@
+# tests/test_excel_sink.py
+from openpyxl import load_workbook
+
+from excel_sink import ExcelSink, EXCEL_HEADERS
+
+def make_row(i):
+    return [f'Page {i}', f'page{i}@shop.pk', f'0300{i:07d}', 'Pakistan', f'https://www.facebook.com/page{i}',
+            f'www.page{i}.pk', 'Karachi', 'Saddar', str(i), str(i * 2), '2026-01-01 00:00:00']
+
+def crash(sink):
+    """Drop a sink the way a killed process would: no checkpoint, no close()"""
+    sink._log.close()
+
+def workbook_rows(path):
+    wb = load_workbook(path, read_only=True)
+    try:
+        return [list(row) for row in wb.active.iter_rows(values_only=True)]
+    finally:
+        wb.close()
+
+def test_rows_appended_after_the_last_checkpoint_survive_a_crash(tmp_path):
+    path = str(tmp_path / 'pages.xlsx')
+    sink = ExcelSink(path, checkpoint_rows=1000, checkpoint_seconds=3600)
+    for i in range(3):
+        sink.append(make_row(i))
+    sink.checkpoint()
+    for i in range(3, 5):
+        sink.append(make_row(i))
+    crash(sink)
+
+    assert len(workbook_rows(path)) == 1 + 3
+
+    reopened = ExcelSink(path, checkpoint_rows=1000, checkpoint_seconds=3600)
+    assert reopened.rows() == [make_row(i) for i in range(5)]
+    reopened.close()
+    assert workbook_rows(path) == [EXCEL_HEADERS] + [make_row(i) for i in range(5)]
+    with open(path + '.log', encoding='utf-8') as f:
+        assert f.read() == ''
+
+def test_replay_skips_rows_the_workbook_already_has(tmp_path):
+    path = str(tmp_path / 'pages.xlsx')
+    sink = ExcelSink(path, checkpoint_rows=1000, checkpoint_seconds=3600)
+    for i in range(3):
+        sink.append(make_row(i))
+    with open(path + '.log', encoding='utf-8') as f:
+        log = f.read()
+    # Crash after the workbook was replaced but before the log was truncated,
+    # and again partway through writing the next line
+    sink.checkpoint()
+    crash(sink)
+    with open(path + '.log', 'w', encoding='utf-8') as f:
+        f.write(log + '{"n": 3, "row": ["Pa')
+
+    reopened = ExcelSink(path, checkpoint_rows=1000, checkpoint_seconds=3600)
+    assert reopened.rows() == [make_row(i) for i in range(3)]
+    reopened.append(make_row(3))
+    assert reopened.rows()[-1] == make_row(3)
+    reopened.close()
+    assert len(workbook_rows(path)) == 1 + 4
@@ -0,0 +1,82 @@
+# tests/test_extraction.py
+import extraction
+
+def values(found):
+    return {field: [match['value'] for match in matches] for field, matches in found.items() if matches}
+
+def test_scan_reports_every_match_with_offsets_and_variant():
+    text = 'Call us on 0300-1234567 or +92 321 7654321'
+    found = extraction.scan(text)
+
+    assert values(found) == {'phone': ['03001234567', '3217654321']}
+    first, second = found['phone']
+    assert text[first['start']:first['end']] == '0300-1234567'
+    assert (first['variant'], second['variant']) == (1, 0)
+
+def test_scan_of_empty_text_finds_nothing():
+    assert extraction.scan('') == {field: [] for field in extraction.FIELDS}
+    assert extraction.extract_fields('') == {field: '' for field in extraction.FIELDS}
+
+def test_email_inside_a_url_belongs_to_the_website():
+    # Matches never overlap: the query string is part of the link, not a contact address
+    text = 'See https://example.com/contact?mail=info@shop.pk for more'
+    assert values(extraction.scan(text)) == {'website': ['https://example.com/contact?mail=info@shop.pk']}
+
+def test_count_wins_over_a_phone_pattern_at_the_same_position():
+    # A bare 8-digit count would otherwise match the UAE phone pattern
+    fields = extraction.extract_fields('12345678 followers and 0300-1234567')
+    assert fields['followers'] == '12345678'
+    assert fields['phone'] == '3001234567'
+
+def test_count_and_label_must_share_a_line():
+    fields = extraction.extract_fields('Call 03001234567\npeople like this')
+    assert fields['phone'] == '3001234567'
+    assert fields['likes'] == ''
+
+    fields = extraction.extract_fields('Call 0300-1234567\n1,234 people like this\n5.6 followers')
+    assert fields['phone'] == '3001234567'
+    assert (fields['likes'], fields['followers']) == ('1,234', '5.6')
+
+def test_extract_fields_keeps_phone_patterns_priority():
+    # The earlier PHONE_PATTERNS entry wins even when it matches later in the text
+    assert extraction.extract_fields('+971 4 123 4567 and (0321) 1234567')['phone'] == '03211234567'
+    # ...and even when its match sits inside text the scanner gave to a later entry
+    assert extraction.extract_fields('Call us on 0300-1234567 or +92 321 7654321')['phone'] == '3001234567'
+
+def test_first_phone_searches_inside_consumed_spans():
+    text = 'Call us on 0300-1234567 or +92 321 7654321'
+    found = extraction.scan(text)
+    assert extraction._first_phone(text, found, 0) == '3001234567'
+    assert extraction._first_phone('no phone here', extraction.scan('no phone here'), 4) == ''
+
+def test_extract_fields_reuses_a_given_scan():
+    text = 'Mail: info@shop.pk or www.shop.pk'
+    found = extraction.scan(text)
+    assert extraction.extract_fields(text, found) == extraction.extract_fields(text)
+    assert extraction.extract_fields(text)['email'] == 'info@shop.pk'
+    assert extraction.extract_fields(text)['website'] == 'www.shop.pk'
+
+def test_normalize_phone_drops_short_numbers():
+    assert extraction.normalize_phone('+92 (300) 123-4567') == '+923001234567'
+    assert extraction.normalize_phone('123-4567') == ''
+
+def test_rank_contacts_scores_repetition_context_and_domain():
+    text = (
+        'Email us: info@karachibakes.pk. Visit www.karachibakes.pk or https://facebook.com/karachibakes. '
+        'Orders: 0300-1234567, again 0300 1234567. Fan page 0321 7654321'
+    )
+    ranked = extraction.rank_contacts(text, 'Karachi Bakes')
+
+    assert [c['value'] for c in ranked['email']] == ['info@karachibakes.pk']
+    assert ranked['email'][0]['score'] == 0.8
+
+    phones = {c['value']: c for c in ranked['phone']}
+    assert phones['03001234567']['occurrences'] == 2
+    assert phones['03001234567']['score'] > phones['03217654321']['score']
+    assert ranked['phone'][0]['value'] == '03001234567'
+
+    websites = [c['value'] for c in ranked['website']]
+    assert websites[0] == 'www.karachibakes.pk'
+    # Facebook's own links are never the business's website
+    assert ranked['website'][-1]['value'].startswith('https://facebook.com/')
+    assert ranked['website'][-1]['score'] < 0.3
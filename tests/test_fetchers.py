@@ -0,0 +1,85 @@
+# tests/test_fetchers.py
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+import driver_pool
+import extraction
+import failures
+import fetchers
+from fake_driver import fake_driver_factory
+from fixture_server import start_fixture_server
+
+@pytest.fixture(scope='module')
+def base_url():
+    server, url = start_fixture_server()
+    yield url
+    server.shutdown()
+
+@pytest.fixture
+def fake_browser():
+    """Point the driver pool at fake drivers serving a client-rendered page"""
+    rendered = {
+        'js.rendered': {
+            'title': 'Rendered Bakery',
+            'text': 'Rendered Bakery\nCall 0300-7654321 or mail hello@rendered.pk',
+        }
+    }
+    previous = driver_pool._pool
+    driver_pool._pool = driver_pool.DriverPool(
+        min_size=0, max_size=1, max_rss_mb=0, factory=fake_driver_factory(pages=rendered, latency=0)
+    )
+    yield
+    driver_pool._pool.shutdown()
+    driver_pool._pool = previous
+
+def extract(url, page):
+    data = extraction.extract_fields(page['text'])
+    data.update({'name': page['title'], 'engine': page['engine']})
+    return data
+
+def test_http_fetcher_reads_a_static_page(base_url):
+    page = fetchers.HttpFetcher().fetch(f'{base_url}/karachi.bakery')
+
+    assert page['title'] == 'Karachi Bakery'
+    assert page['address'] == 'Shop 4, Tariq Road, Karachi, Pakistan'
+    assert 'window.__data' not in page['text']
+    assert set(page['timings']) == {'navigation', 'extraction'}
+    assert failures.classify_page(page) is None
+
+def test_static_page_needs_no_browser(base_url, fake_browser):
+    data = fetchers.fetch_and_extract(f'{base_url}/karachi.bakery', extract, engine='auto')
+
+    assert data['engine'] == 'http'
+    assert (data['name'], data['email'], data['phone']) == ('Karachi Bakery', 'orders@karachibakery.pk', '3001234567')
+    assert data['likes'] == '12,345'
+    assert 'navigation' in data['phase_timings']
+
+def test_client_rendered_page_escalates_to_selenium(base_url, fake_browser):
+    page = fetchers.HttpFetcher().fetch(f'{base_url}/js.rendered')
+    assert failures.classify_page(page) == failures.PARSE_MISS
+
+    data = fetchers.fetch_and_extract(f'{base_url}/js.rendered', extract, engine='auto')
+    assert data['engine'] == 'selenium'
+    assert (data['name'], data['email'], data['phone']) == ('Rendered Bakery', 'hello@rendered.pk', '3007654321')
+
+def test_http_only_engine_raises_the_page_failure(base_url):
+    with pytest.raises(failures.ScrapeFailure) as error:
+        fetchers.fetch_and_extract(f'{base_url}/js.rendered', extract, engine='http')
+    assert error.value.kind == failures.PARSE_MISS
+
+def test_login_wall_is_classified_blocked(base_url):
+    page = fetchers.HttpFetcher().fetch(f'{base_url}/login_wall')
+    assert failures.classify_page(page) == failures.BLOCKED
+
+    with pytest.raises(failures.ScrapeFailure) as error:
+        fetchers.fetch_and_extract(f'{base_url}/login_wall', extract, engine='http')
+    assert error.value.kind == failures.BLOCKED
+
+def test_missing_page_is_classified_not_found(base_url):
+    with pytest.raises(failures.ScrapeFailure) as error:
+        fetchers.HttpFetcher().fetch(f'{base_url}/no.such.page')
+    assert error.value.kind == failures.NOT_FOUND
@@ -0,0 +1,152 @@
+# tests/test_scheduler.py
+import os
+import sys
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orchestrator
+from scheduler import Lane, ScheduledJob
+
+class Recorder:
+    """A Lane wired to a thread pool that records what ran, and when"""
+
+    def __init__(self, capacity=4, delay=0.01, gate=None):
+        self.delay = delay
+        self.gate = gate
+        self.started = []
+        self.results = []
+        self.done = {}
+        self.streams = 0
+        self.running = {}
+        self.peak = {}
+        self.lock = threading.Lock()
+        self.all_done = threading.Condition(self.lock)
+        self.lane = Lane('test', self.run, lambda: capacity, self.on_result, self.on_job_done)
+
+    def work(self, item):
+        job_id, value = item
+        with self.lock:
+            self.started.append(item)
+            self.running[job_id] = self.running.get(job_id, 0) + 1
+            self.peak[job_id] = max(self.peak.get(job_id, 0), self.running[job_id])
+        if self.gate is not None:
+            self.gate.wait()
+        time.sleep(self.delay)
+        with self.lock:
+            self.running[job_id] -= 1
+        return value
+
+    def run(self, items, window):
+        with self.lock:
+            self.streams += 1
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            yield from orchestrator.stream(items, self.work, window, executor)
+
+    def on_result(self, job_id, item, result, error):
+        with self.lock:
+            self.results.append((job_id, item, result, error))
+
+    def on_job_done(self, job):
+        with self.lock:
+            self.done[job.job_id] = job
+            self.all_done.notify_all()
+
+    def wait_for(self, *job_ids, timeout=10):
+        with self.lock:
+            assert self.all_done.wait_for(lambda: all(job_id in self.done for job_id in job_ids), timeout)
+
+def test_per_job_caps_are_respected():
+    recorder = Recorder(capacity=4)
+    recorder.lane.submit(ScheduledJob('a', range(12), max_in_flight=1))
+    recorder.lane.submit(ScheduledJob('b', range(12), max_in_flight=2))
+    recorder.lane.submit(ScheduledJob('c', range(12)))
+    recorder.wait_for('a', 'b', 'c')
+    recorder.lane.shutdown()
+
+    assert recorder.peak['a'] == 1
+    assert recorder.peak['b'] <= 2
+    assert recorder.peak['c'] <= 4
+    for job_id in 'abc':
+        assert sorted(result for done_id, _, result, _ in recorder.results if done_id == job_id) == list(range(12))
+
+def test_higher_priority_job_runs_first():
+    gate = threading.Event()
+    recorder = Recorder(capacity=1, delay=0, gate=gate)
+    recorder.lane.submit(ScheduledJob('low', range(3)))
+    # 'low' holds the only slot until the gate opens
+    while not recorder.started:
+        time.sleep(0.01)
+    recorder.lane.submit(ScheduledJob('high', range(3), priority=1))
+    gate.set()
+    recorder.wait_for('low', 'high')
+    recorder.lane.shutdown()
+
+    order = [job_id for job_id, _ in recorder.started]
+    assert order == ['low', 'high', 'high', 'high', 'low', 'low']
+
+def test_late_job_shares_slots_with_running_job():
+    recorder = Recorder(capacity=1, delay=0.002)
+    recorder.lane.submit(ScheduledJob('a', range(200)))
+    while len(recorder.started) < 50:
+        time.sleep(0.005)
+    with recorder.lock:
+        joined = len(recorder.started)
+    recorder.lane.submit(ScheduledJob('b', range(200)))
+    recorder.wait_for('a', 'b', timeout=30)
+    recorder.lane.shutdown()
+
+    # Equal weights alternate from the moment b joins instead of b catching up on a's 50
+    after = [job_id for job_id, _ in recorder.started[joined:joined + 40]]
+    assert after.count('a') >= 18
+    assert after.count('b') >= 18
+
+def test_job_whose_items_fail_ends_without_stopping_the_lane():
+    def failing_items():
+        yield 0
+        raise RuntimeError('database is locked')
+
+    recorder = Recorder(capacity=2)
+    recorder.lane.submit(ScheduledJob('a', range(20)))
+    recorder.lane.submit(ScheduledJob('b', failing_items()))
+    recorder.wait_for('a', 'b')
+    recorder.lane.submit(ScheduledJob('c', range(5)))
+    recorder.wait_for('c')
+    recorder.lane.shutdown()
+
+    assert isinstance(recorder.done['b'].error, RuntimeError)
+    assert recorder.done['a'].error is None
+    assert recorder.done['a'].in_flight == 0
+    assert sorted(result for job_id, _, result, _ in recorder.results if job_id == 'a') == list(range(20))
+    assert recorder.streams == 1
+
+def test_stop_finishes_job_without_dispatching_the_rest():
+    recorder = Recorder(capacity=2, delay=0.05)
+    recorder.lane.submit(ScheduledJob('a', range(100)))
+    while len(recorder.started) < 2:
+        time.sleep(0.01)
+    assert recorder.lane.stop('a')
+    recorder.wait_for('a')
+    recorder.lane.shutdown()
+
+    job = recorder.done['a']
+    assert job.stopped
+    assert job.dispatched < 100
+    assert len(recorder.results) == job.dispatched
+    assert not recorder.lane.stop('a')
+
+def test_one_stream_serves_jobs_that_come_and_go():
+    recorder = Recorder(capacity=4)
+    recorder.lane.submit(ScheduledJob('a', range(5), max_in_flight=1))
+    recorder.wait_for('a')
+    # With no jobs left the stream waits rather than ending
+    time.sleep(0.05)
+    recorder.lane.submit(ScheduledJob('b', range(5), max_in_flight=2))
+    recorder.wait_for('b')
+    recorder.lane.shutdown()
+
+    assert recorder.streams == 1
+    assert not recorder.lane._thread.is_alive()
+    assert len(recorder.results) == 10
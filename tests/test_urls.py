@@ -0,0 +1,40 @@
+# tests/test_urls.py
+import urls
+
+def test_sk_tab_is_part_of_the_page():
+    assert urls.canonicalize('https://www.facebook.com/shop?sk=about') == 'https://www.facebook.com/shop?sk=about'
+    assert urls.canonicalize('https://m.facebook.com/profile.php?id=42&sk=about&ref=bookmarks') == \
+        'https://www.facebook.com/profile.php?id=42&sk=about'
+    assert urls.dedupe(['https://www.facebook.com/shop', 'https://www.facebook.com/shop?sk=about']) == [
+        'https://www.facebook.com/shop', 'https://www.facebook.com/shop?sk=about'
+    ]
+
+def test_host_variants_and_tracking_params_collapse_to_one_link():
+    variants = [
+        'http://m.facebook.com/KarachiBakes/?ref=bookmarks&fbclid=abc',
+        'https://web.facebook.com/karachibakes#posts',
+        'fb.com/karachibakes/',
+        'https://www.facebook.com//KarachiBakes?utm_source=x&__cft__[0]=y&__tn__=K',
+    ]
+    assert {urls.canonicalize(link) for link in variants} == {'https://www.facebook.com/karachibakes'}
+
+def test_profile_and_people_links_reduce_to_the_id():
+    assert urls.canonicalize('https://m.facebook.com/profile.php?id=100&locale=en_GB&v=info') == \
+        'https://www.facebook.com/profile.php?id=100'
+    assert urls.canonicalize('https://www.facebook.com/people/Karachi-Bakes/100/') == \
+        'https://www.facebook.com/profile.php?id=100'
+
+def test_other_hosts_keep_their_case_and_real_params():
+    assert urls.canonicalize('HTTP://Shop.PK:80/Menu/?b=2&a=1&utm_medium=fb') == 'http://shop.pk/Menu?a=1&b=2'
+    assert urls.canonicalize('https://shop.pk:8443/') == 'https://shop.pk:8443'
+    assert urls.canonicalize('   ') == ''
+
+def test_dedupe_keeps_first_occurrence_order():
+    links = [
+        'https://www.facebook.com/b',
+        'https://m.facebook.com/a?fref=ts',
+        'https://facebook.com/B/',
+        '',
+        'https://www.facebook.com/a',
+    ]
+    assert urls.dedupe(links) == ['https://www.facebook.com/b', 'https://www.facebook.com/a']
@@ -0,0 +1,169 @@
+# urls.py
+import re
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, urlencode
+from bs4 import BeautifulSoup
+
+# Page link formats worth scraping, tried against each <a href>
+FACEBOOK_PATTERNS = (
+    r'https?://(www\.)?facebook\.com/[A-Za-z0-9_.-]+/?',
+    r'https?://(www\.)?facebook\.com/pages/[^/]+/\d+',
+    r'https?://(www\.)?facebook\.com/profile\.php\?id=\d+',
+    r'https?://(www\.)?facebook\.com/groups/[A-Za-z0-9_.-]+'
+)
+
+# Saved pages are fed to the parser in slices of this many characters
+FEED_CHUNK_SIZE = 1 << 16
+
+_combined = {}
+
+def compile_patterns(patterns=FACEBOOK_PATTERNS):
+    """Compile link patterns into one cached alternation.
+
+    Matching it with .match() accepts exactly the hrefs that re.match() with
+    any single pattern would, in one call instead of one per pattern.
+    """
+    patterns = tuple(patterns)
+    if patterns not in _combined:
+        _combined[patterns] = re.compile('|'.join(f'(?:{pattern})' for pattern in patterns))
+    return _combined[patterns]
+
+class _HrefParser(HTMLParser):
+    """Collects matching <a href> values and ignores everything else"""
+
+    def __init__(self, pattern, base_url):
+        super().__init__(convert_charrefs=True)
+        self.pattern = pattern
+        self.base_url = base_url
+        self.links = {}
+
+    def handle_starttag(self, tag, attrs):
+        if tag != 'a':
+            return
+        for name, value in attrs:
+            if name == 'href' and value:
+                self._add(value)
+                break
+
+    handle_startendtag = handle_starttag
+
+    def _add(self, href):
+        if self.pattern.match(href):
+            if self.base_url and not href.startswith('http'):
+                href = urljoin(self.base_url, href)
+            self.links[href] = None
+
+def extract_links_streaming(html_content, base_url='https://www.facebook.com', patterns=FACEBOOK_PATTERNS):
+    """Extract matching links without building a document tree.
+
+    The HTML is fed to an HTMLParser in FEED_CHUNK_SIZE slices and only the
+    href of each <a> tag is looked at, so memory stays flat however large
+    the saved page is. Links are returned once each, in document order.
+    """
+    parser = _HrefParser(compile_patterns(patterns), base_url)
+    for start in range(0, len(html_content), FEED_CHUNK_SIZE):
+        parser.feed(html_content[start:start + FEED_CHUNK_SIZE])
+    parser.close()
+    return list(parser.links)
+
+def extract_links_soup(html_content, base_url='https://www.facebook.com', patterns=FACEBOOK_PATTERNS):
+    """Extract matching links from a full BeautifulSoup tree"""
+    soup = BeautifulSoup(html_content, 'html.parser')
+    links = set()
+
+    for a_tag in soup.find_all('a', href=True):
+        href = a_tag['href']
+        for pattern in patterns:
+            if re.match(pattern, href):
+                if base_url and not href.startswith('http'):
+                    href = urljoin(base_url, href)
+                links.add(href)
+                break
+
+    return list(links)
+
+def extract_links(html_content, base_url='https://www.facebook.com', patterns=FACEBOOK_PATTERNS):
+    """Extract matching links, falling back to BeautifulSoup if streaming fails"""
+    try:
+        return extract_links_streaming(html_content, base_url, patterns)
+    except Exception as e:
+        print(f"Streaming link extraction failed, falling back to BeautifulSoup: {e}")
+        return extract_links_soup(html_content, base_url, patterns)
+
+# Host aliases that serve the same pages as www.facebook.com
+FACEBOOK_HOSTS = {
+    'facebook.com', 'www.facebook.com', 'm.facebook.com', 'mobile.facebook.com',
+    'web.facebook.com', 'touch.facebook.com', 'mbasic.facebook.com', 'fb.com', 'www.fb.com'
+}
+CANONICAL_FACEBOOK_HOST = 'www.facebook.com'
+
+# Query parameters that only track how a link was reached
+TRACKING_PARAMS = {
+    'ref', 'fref', 'hc_ref', 'hc_location', 'refid', 'rdid', 'share_url', 'mibextid',
+    'fbclid', 'gclid', 'igshid', 'locale', 'paipv', 'eav', '__tn__', '__cft__[0]',
+    '__xts__[0]', '__eep__', 'notif_id', 'notif_t', 'comment_id', 'acontext'
+}
+TRACKING_PREFIXES = ('utm_', '__cft__', '__xts__')
+
+PEOPLE_PATH = re.compile(r'^/people/[^/]+/(\d+)$')
+
+def _is_tracking(name):
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+def canonicalize(url):
+    """Reduce a link to one canonical form so variants of a page compare equal.
+
+    Facebook host aliases (m., mobile., web., fb.com, ...) become
+    www.facebook.com, the scheme becomes https, fragments, tracking
+    parameters and trailing slashes are dropped, and profile.php keeps only
+    its id and sk (the tab, as in sk=about). Facebook page paths are
+    case-insensitive, so they are lowercased; /people/<name>/<id> becomes
+    profile.php?id=<id>. Text that does not parse as a URL is returned
+    stripped but otherwise unchanged.
+    """
+    url = url.strip()
+    if not url:
+        return url
+    if '://' not in url:
+        url = 'https://' + url.lstrip('/')
+    try:
+        parts = urlsplit(url)
+        host = (parts.hostname or '').lower()
+        port = parts.port
+    except ValueError:
+        return url
+    if not host:
+        return url
+
+    path = re.sub('/{2,}', '/', parts.path).rstrip('/')
+    query = [(name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+             if not _is_tracking(name)]
+
+    if host in FACEBOOK_HOSTS:
+        host = CANONICAL_FACEBOOK_HOST
+        path = path.lower()
+        people = PEOPLE_PATH.match(path)
+        if people:
+            path, query = '/profile.php', [('id', people.group(1))]
+        elif path == '/profile.php':
+            # Only the first id and sk are kept
+            kept = dict(reversed([(name, value) for name, value in query if name in ('id', 'sk')]))
+            query = list(kept.items())
+        scheme = 'https'
+        port = None
+    else:
+        scheme = parts.scheme.lower() if parts.scheme.lower() in ('http', 'https') else 'https'
+        if (scheme, port) in (('http', 80), ('https', 443)):
+            port = None
+
+    netloc = f'{host}:{port}' if port else host
+    return urlunsplit((scheme, netloc, path, urlencode(sorted(query)), ''))
+
+def dedupe(links):
+    """Canonicalize links and drop repeats, keeping the first occurrence's order"""
+    unique = {}
+    for link in links:
+        link = canonicalize(link)
+        if link:
+            unique[link] = None
+    return list(unique)